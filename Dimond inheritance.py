@@ -1,109 +1,37 @@
-
 from functools import reduce
-from operator import mul
-
-def make_class(attributes, base_class=None):
-    """
-    Create a new class represented as a dispatch dictionary.
-
-    Args:
-        attributes (dict): A dictionary containing the attributes and methods of the class.
-        base_class (list, optional): A list of base classes (dispatch dictionaries) to inherit from.
-
-    Returns:
-        dict: A dispatch dictionary representing the class.
-    """
-
-    def get_value(name):
-        """Retrieve an attribute or method, checking base classes if necessary."""
-        if name in attributes:
-            return attributes[name]
-        elif base_class is not None:
-            for base in base_class:
-                if base['get'](name):
-                    return base['get'](name)
-
-    def set_value(name, value):
-        """Set an attribute or method in the class."""
-        attributes[name] = value
-
-    def new(*args):
-        """Create a new instance of the class and initialize it."""
-        return init_instance(cls, *args)
-
-    cls = {'get': get_value, 'set': set_value, 'new': new}
-    return cls
-
-def init_instance(cls, *args):
-    """
-    Create a new object instance of type cls and initialize it with args.
-
-    Args:
-        cls (dict): The dispatch dictionary representing the class.
-        *args: Arguments to pass to the '__init__' method if it exists.
-
-    Returns:
-        dict: A dispatch dictionary representing the instance.
-    """
-    instance = make_instance(cls)
-    init = cls['get']('__init__')
-    if init:
-        init(instance, *args)
-    return instance
-
-def make_instance(cls):
-    """
-    Create a new object instance, represented as a dispatch dictionary.
-
-    Args:
-        cls (dict): The dispatch dictionary representing the class.
-
-    Returns:
-        dict: A dispatch dictionary representing the instance.
-    """
-    attributes = {}
-
-    def get_value(name):
-        """Retrieve an attribute or method, checking the class if necessary."""
-        if name in attributes:
-            return attributes[name]
-        else:
-            method_name = cls['get'](name)
-            return bind_method(method_name, instance)
-
-    def set_value(name, value):
-        """Set an attribute or method in the instance."""
-        attributes[name] = value
-
-    instance = {'get': get_value, 'set': set_value}
-    return instance
-
-def bind_method(method_name, instance):
-    """
-    Bind a method to an instance if it is callable.
-
-    Args:
-        method_name (callable or any): A method or attribute retrieved from the class.
-        instance (dict): The dispatch dictionary representing the instance.
-
-    Returns:
-        callable or any: A bound method if `method_name` is callable, otherwise the original value.
-    """
-    if callable(method_name):
-        def method(*args):
-            return method_name(instance, *args)
-
-        return method
-    else:
-        return method_name
-
-
-
-def MyDate():
+import gc
+import sys
+import threading
+import time
+
+from diamond import core
+from diamond.batches import make_batch
+from diamond.columns import make_column_store
+from diamond.compiled import compile_class
+from diamond.core import (CLASSES, as_base, bind_method, define_classes, get_class, init_base, make_class, make_field,
+                          make_instance, register_class)
+from diamond.dates import ages, bucket_dates, date_ordinals, dates_between, sort_by_date
+from diamond.indexes import make_index
+from diamond.ingest import ingest_roster
+from diamond.lazy import make_lazy_instance
+from diamond.profiling import disable_profiling, enable_profiling, profile_report, profile_snapshot
+from diamond.queries import make_query
+from diamond.render import cache_rendering
+from diamond.roster import read_roster, write_roster
+from diamond.serialization import dump_instance, load_instance
+from diamond.snapshots import load_snapshot, write_snapshot
+
+
+def MyDate(frozen=False):
     """
       Creates a new class representing a date with day, month, and year attributes.
       Supports getting and setting these attributes with validation.
 
+      Every date carries its packed yyyymmdd ordinal in a derived field, set by
+      '__init__' and kept current by the setters, so comparing and sorting dates
+      reads one integer. With frozen=True the dates are immutable and interned:
+      equal dates are one shared instance whose string is computed once.
+
       Methods:
           - __init__(day, month, year): Initializes the date.
           - __repr__(): Returns a string representation of the object.
@@ -114,6 +42,8 @@ def MyDate():
           - setDay(day): Sets the day if within valid range (1-30).
           - setMonth(month): Sets the month if within valid range (1-12).
           - setYear(year): Sets the year if within valid range (1900-2100).
+          - getOrdinal(): Returns the date packed as the integer yyyymmdd.
+          - setOrdinal(ordinal): Sets the day, month and year from a yyyymmdd integer.
       """
 
     def __init__(self, day, month, year=2020):
@@ -122,6 +52,7 @@ def MyDate():
         self['set']('day', day)
         self['set']('month', month)
         self['set']('year', year)
+        self['set']('ordinal', year * 10000 + month * 100 + day)
 
     def __repr__(self):
         """Returns a string representation of the date object."""
@@ -129,38 +60,46 @@ def MyDate():
 
     def __str__(self):
         """Returns the date formatted as dd.mm.yyyy."""
-        return f'{str(getDay(self))}.{str(getMonth(self))}.{str(getYear(self))}'
-
-    def getDay(self):
-        """Returns the day value."""
-        return self['get']('day')
-
-    def getMonth(self):
-        """Returns the month value."""
-        return self['get']('month')
-
-    def getYear(self):
-        """Returns the year value."""
-        return self['get']('year')
-
-    def setDay(self, day):
-        """Sets the day if within the valid range (1-30)."""
-        if 1 <= day <= 30:
-            self['set']('day', day)
-
-    def setMonth(self, month):
-        """Sets the month if within the valid range (1-12)."""
-        if 1 <= month <= 12:
-            self['set']('month', month)
-
-    def setYear(self, year):
-        """Sets the year if within the valid range (1900-2100)."""
-        if 1900 <= year <= 2100:
-            self['set']('year', year)
-
-    return make_class({'__init__': __init__, 'str': __str__, '__repr__': __repr__, 'getDay': getDay, 'getMonth': getMonth, 'getYear': getYear,
-                       'setDay': setDay, 'setMonth': setMonth, 'setYear': setYear})
-Date = MyDate()
+        return f"{str(self['get']('day'))}.{str(self['get']('month'))}.{str(self['get']('year'))}"
+
+    def getOrdinal(self):
+        """Returns the date packed as the integer yyyymmdd, which compares and sorts like the date."""
+        ordinal = self['get']('ordinal')
+        if ordinal is None:  # a date restored from its parts only, such as from a snapshot
+            ordinal = self['get']('year') * 10000 + self['get']('month') * 100 + self['get']('day')
+        return ordinal
+
+    def setOrdinal(self, ordinal):
+        """Sets the day, month and year from a yyyymmdd integer, if each part is valid."""
+        for spec, value in zip(fields, (ordinal % 100, ordinal // 100 % 100, ordinal // 10000)):
+            if not spec['validator'](value):
+                return
+        __init__(self, ordinal % 100, ordinal // 100 % 100, ordinal // 10000)
+
+    def part_setter(spec):
+        """Returns the validated setter of a date part, which also updates the ordinal."""
+        name, validator = spec['name'], spec['validator']
+
+        def setter(self, value):
+            if validator(value):
+                parts = {part: self['get'](part) for part in ('day', 'month', 'year')}
+                parts[name] = value
+                self['set'](name, value)
+                self['set']('ordinal', parts['year'] * 10000 + parts['month'] * 100 + parts['day'])
+
+        setter.__name__, setter.__doc__ = 'set' + name.capitalize(), f'Sets the {name} if valid.'
+        return setter
+
+    fields = [make_field('day', lambda day: 1 <= day <= 30),
+              make_field('month', lambda month: 1 <= month <= 12),
+              make_field('year', lambda year: 1900 <= year <= 2100),
+              make_field('ordinal', derived=True)]
+    # getDay/getMonth/getYear are generated from the field specs.
+    return make_class({'__init__': __init__, 'str': __str__, '__repr__': __repr__, 'getOrdinal': getOrdinal,
+                       'setOrdinal': setOrdinal, **{f"set{spec['name'].capitalize()}": part_setter(spec) for spec in fields[:3]}},
+                      fields=fields, name='FrozenDate' if frozen else 'MyDate', frozen=frozen, intern=frozen)
+Date = register_class('MyDate', MyDate)
+FrozenDate = register_class('FrozenDate', MyDate, frozen=True)
 
 def Person():
     """
@@ -192,54 +131,27 @@ def Person():
     def __repr__(self):
         """Returns a string representation of the person."""
 
-        return 'Person({0}, {1}, {2}, {3})'.format(getFirstName(self), getLastName(self), getDate(self), getId(self))
+        return 'Person({0}, {1}, {2}, {3})'.format(self['get']('firstName'), self['get']('lastName'), getDate(self), self['get']('id'))
 
     def __str__(self):
         """Returns a string representation of the person."""
         return strAttributes(self)
 
     def getAttributes(self):
-        return '{0}, {1}, {2}, {3}'.format(getFirstName(self), getLastName(self), getDate(self), getId(self))
+        return '{0}, {1}, {2}, {3}'.format(self['get']('firstName'), self['get']('lastName'), getDate(self), self['get']('id'))
 
     def strAttributes(self):
-        return f'name: {str(getFirstName(self))} {str(getLastName(self))}\nDoB: {str(getDate(self))} \nID: {str(getId(self))}'
-
-    def getFirstName(self):
-        """Returns the first name."""
-        return self['get']('firstName')
-
-    def getLastName(self):
-        """Returns the last name."""
-        return self['get']('lastName')
+        return f"name: {str(self['get']('firstName'))} {str(self['get']('lastName'))}\nDoB: {str(getDate(self))} \nID: {str(self['get']('id'))}"
 
     def getDate(self):
         """Returns the formatted birth date."""
         return self['get']('date')['get']('str')()
 
-    def getId(self):
-        """Returns the ID."""
-        return self['get']('id')
-
-    def setFirstName(self, firstName):
-        """Sets the first name."""
-        self['set']('firstName', firstName)
-
-    def setLastName(self, lastName):
-        """Sets the last name."""
-        self['set']('lastName', lastName)
-
-    def setDate(self, date):
-        """Sets the birth date."""
-        self['set']('date', date)
-
-    def setId(self, id):
-        """Sets the ID if positive."""
-        if id > 0:
-            self['set']('id', id)
-
-    return make_class({'__init__': __init__, 'str': __str__, 'repr': __repr__, 'getFirstName': getFirstName,  'getLastName': getLastName,  'getId': getId, 'getDate':getDate,
-                       'setFirstName': setFirstName, 'setLastName': setLastName, 'setDate': setDate, 'setId': setId, 'getAttributes': getAttributes, 'strAttributes':strAttributes})
-Person = Person()
+    # The remaining getters and setters, including the positive-only setId, are generated from the field specs.
+    return make_class({'__init__': __init__, 'str': __str__, 'repr': __repr__, 'getDate':getDate,
+                       'getAttributes': getAttributes, 'strAttributes':strAttributes},
+                      fields=['firstName', 'lastName', 'date', make_field('id', lambda id: id > 0)], name='Person')
+Person = register_class('Person', Person)
 
 def Student():
     """
@@ -264,7 +176,7 @@ def Student():
             grades (float): The student's average grades.
             seniority (int): The student's year of study (e.g., 1st, 2nd, 3rd year).
         """
-        Person['get']('__init__')(self, firstName, lastName, date, id)  # Initialize the parent class (Person)
+        init_base(self, Person, firstName, lastName, date, id)  # Initialize the parent class (Person)
         self['set']('faculty', faculty)
         self['set']('grades', grades)
         self['set']('seniority', seniority)
@@ -296,7 +208,7 @@ def Student():
         Returns:
             str: A string containing the student's faculty, grades, and seniority.
         """
-        return '{0}, {1}, {2}'.format(getFaculty(self), getGrades(self), getSeniority(self))
+        return '{0}, {1}, {2}'.format(self['get']('faculty'), self['get']('grades'), self['get']('seniority'))
 
     def strAttributes(self):
         """
@@ -305,76 +217,17 @@ def Student():
         Returns:
             str: A string representing the student's academic details.
         """
-        return f'\nLearning: {str(getFaculty(self))} \nAvg: {str(getGrades(self))}\nSeniority: {str(getSeniority(self))}'
-
-    def getFaculty(self):
-        """
-        Getter method for the student's faculty.
-
-        Returns:
-            str: The student's faculty.
-        """
-        return self['get']('faculty')
-
-    def getGrades(self):
-        """
-        Getter method for the student's grades.
-
-        Returns:
-            float: The student's average grades.
-        """
-        return self['get']('grades')
-
-    def getSeniority(self):
-        """
-        Getter method for the student's seniority.
-
-        Returns:
-            int: The student's year of study (e.g., 1st year, 2nd year).
-        """
-        return self['get']('seniority')
-
-    def setFaculty(self, faculty):
-        """
-        Setter method for the student's faculty.
-
-        Args:
-            faculty (str): The new faculty for the student.
-        """
-        self['set']('faculty', faculty)
-
-    def setGrades(self, grades):
-        """
-        Setter method for the student's grades.
-
-        Args:
-            grades (float): The new average grades for the student.
-        """
-        self['set']('grades', grades)
-
-    def setSeniority(self, seniority):
-        """
-        Setter method for the student's seniority.
-
-        Args:
-            seniority (int): The new year of study for the student.
-        """
-        self['set']('seniority', seniority)
+        return f"\nLearning: {str(self['get']('faculty'))} \nAvg: {str(self['get']('grades'))}\nSeniority: {str(self['get']('seniority'))}"
 
+    # getFaculty/getGrades/getSeniority and their setters are generated from the field specs.
     return make_class({
         '__init__': __init__,
         'str': __str__,
         'repr': __repr__,
-        'getFaculty': getFaculty,
-        'getGrades': getGrades,
-        'getSeniority': getSeniority,
-        'setFaculty': setFaculty,
-        'setGrades': setGrades,
-        'setSeniority': setSeniority,
         'getAttributes': getAttributes,
         'strAttributes': strAttributes
-    }, [Person])
-Student = Student()
+    }, [Person], fields=['faculty', 'grades', 'seniority'], name='Student')
+Student = register_class('Student', Student)
 
 def Faculty ():
     """
@@ -385,7 +238,7 @@ def Faculty ():
         """
         Initializes a new faculty member with given details.
         """
-        Person['get']('__init__')(self, firstName, lastName, date, id)
+        init_base(self, Person, firstName, lastName, date, id)
         self['set']('teaching', teaching)  # Set the teaching attribute
         self['set']('salary', salary)  # Set the salary attribute
         self['set']('seniority', seniority)  # Set the seniority attribute
@@ -406,55 +259,19 @@ def Faculty ():
         """
         Returns the combined attributes of the Faculty member.
         """
-        return '{0}, {1}, {2}'.format(getTeaching(self), getSalary(self), getSeniority(self))
+        return '{0}, {1}, {2}'.format(self['get']('teaching'), self['get']('salary'), self['get']('seniority'))
 
     def strAttributes(self):
         """
         Returns formatted teaching, salary, and seniority details.
         """
-        return f'\nTeaching: {str(getTeaching(self))} \nSalary: {str(getSalary(self))}\nSeniority: {str(getSeniority(self))}'
-
-    def getTeaching(self):
-        """
-        Gets the teaching subject of the faculty member.
-        """
-        return self['get']('teaching')
-
-    def getSalary(self):
-        """
-        Gets the salary of the faculty member.
-        """
-        return self['get']('salary')
-
-    def getSeniority(self):
-
-        """
-        Gets the seniority level of the faculty member.
-        """
-        return self['get']('seniority')
-
-    def setTeaching(self, teaching):
-        """
-        Sets the teaching subject for the faculty member.
-        """
-        self['set']('teaching', teaching)
-
-    def setSalary(self, salary):
-        """
-        Sets the salary for the faculty member.
-        """
-        self['set']('salary', salary)
-
-    def setSeniority(self, seniority):
-        """
-        Sets the seniority level for the faculty member.
-        """
-        self['set']('seniority', seniority)
+        return f"\nTeaching: {str(self['get']('teaching'))} \nSalary: {str(self['get']('salary'))}\nSeniority: {str(self['get']('seniority'))}"
 
+    # getTeaching/getSalary/getSeniority and their setters are generated from the field specs.
     # Returns a new Faculty class by creating a class using the make_class method, extending the Person class.
-    return make_class({'__init__': __init__, 'str': __str__, 'repr': __repr__, 'getTeaching': getTeaching,  'getSalary': getSalary,  'getSeniority': getSeniority,
-                       'setTeaching': setTeaching, 'setSalary': setSalary, 'setSeniority': setSeniority, 'getAttributes': getAttributes, 'strAttributes':strAttributes}, [Person])
-Faculty = Faculty()  # Instantiate the Faculty class
+    return make_class({'__init__': __init__, 'str': __str__, 'repr': __repr__, 'getAttributes': getAttributes, 'strAttributes':strAttributes},
+                      [Person], fields=['teaching', 'salary', 'seniority'], name='Faculty')
+Faculty = register_class('Faculty', Faculty)  # Built on first use
 
 def TA ():
     """
@@ -464,21 +281,22 @@ def TA ():
     def __init__(self, firstName, lastName, date, id, faculty, grades, s_seniority, teaching, salary, f_seniority):
         """
         Initializes a new Teaching Assistant (TA) by combining attributes of Student and Faculty classes.
+        Person is initialized once, and the faculty seniority is kept apart from the student seniority.
         """
-        Student['get']('__init__')(self, firstName, lastName, date, id, faculty, grades, s_seniority)
-        Faculty['get']('__init__')(self, firstName, lastName, date, id, teaching, salary, f_seniority)
+        init_base(self, Student, firstName, lastName, date, id, faculty, grades, s_seniority)
+        init_base(self, Faculty, firstName, lastName, date, id, teaching, salary, f_seniority)
 
     def __repr__(self):
         """
         Returns a string representation of the TA object, combining attributes of Student and Faculty.
         """
-        return f"TA({Person['get']('getAttributes')(self)}, {Student['get']('getAttributes')(self)}, {Faculty['get']('getAttributes')(self)})"
+        return f"TA({Person['get']('getAttributes')(self)}, {Student['get']('getAttributes')(self)}, {Faculty['get']('getAttributes')(as_base(self, Faculty))})"
 
     def __str__(self):
         """
         Returns a string version of the TA object, combining string representations of Student and Faculty.
         """
-        return Student['get']('str')(self) + Faculty['get']('strAttributes')(self)
+        return Student['get']('str')(self) + Faculty['get']('strAttributes')(as_base(self, Faculty))
 
     def getStudentSeniority(self):
         """
@@ -490,7 +308,7 @@ def TA ():
         """
         Gets the seniority level of the Faculty.
         """
-        return Faculty['get']('getSeniority')(self)
+        return Faculty['get']('getSeniority')(as_base(self, Faculty))
 
     def setStudentSeniority(self, seniority):
         """
@@ -502,14 +320,89 @@ def TA ():
         """
         Sets the seniority level for the Faculty.
         """
-        Faculty['get']('setSeniority')(self, seniority)
+        Faculty['get']('setSeniority')(as_base(self, Faculty), seniority)
 
     # Returns a new TA class by creating a class using the make_class method, inheriting from both Student and Faculty classes.
+    # '__columns__' names the getters that read back the constructor arguments that are not stored under their own name.
     return make_class({'__init__': __init__, 'str': __str__, 'repr': __repr__, 'getStudentSeniority':getStudentSeniority, 'getFacultySeniority':getFacultySeniority,
-                       'setStudentSeniority':setStudentSeniority, 'setFacultySeniority':setFacultySeniority}, [Student, Faculty] )
-TA = TA()  # Instantiate the TA class
+                       'setStudentSeniority':setStudentSeniority, 'setFacultySeniority':setFacultySeniority,
+                       '__columns__': {'s_seniority': 'getStudentSeniority', 'f_seniority': 'getFacultySeniority'}}, [Student, Faculty], name='TA')
+TA = register_class('TA', TA)  # Built on first use
 
 
+# Concurrency
+def stress_concurrency(threads=8, seconds=1.0):
+    """
+    Hammer shared classes, instances and an index from reader and writer threads and report contract violations.
+
+    Readers resolve methods through TA and call them on a shared TA; writers keep
+    redefining a Person attribute, toggling a watch hook and moving the shared
+    instances between index keys. A violation is a lookup of a name that always
+    exists returning None, an exception in any thread, an index lookup returning
+    something that was never indexed, or, once the threads have stopped, an
+    instance missing from the index under its final id.
+
+    Args:
+        threads (int): Number of reader threads; a quarter as many writers (at least one) run alongside.
+        seconds (float): How long to run.
+
+    Returns:
+        dict: Reads, writes and violations counted over the run.
+    """
+    date = Date['new'](15, 12, 1999)
+    shared = [TA['new']('shulamit', 'Mor yossef', date, i + 1, 'swe', 100, 3, 'swe', 30000, 3) for i in range(16)]
+    byId = make_index(Person, 'id', instances=shared)
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'violations': 0}
+    counts_lock = threading.Lock()
+
+    def reader():
+        reads = violations = 0
+        try:
+            while not stop.is_set():
+                for ta in shared:
+                    if TA['get']('getFirstName') is None or ta['get']('getFirstName')() != 'shulamit':
+                        violations += 1
+                    for found in byId['find'](ta['get']('getId')()):
+                        if not any(found is other for other in shared):
+                            violations += 1
+                    reads += 1
+        except Exception:
+            violations += 1
+        with counts_lock:
+            counts['reads'] += reads
+            counts['violations'] += violations
+
+    def writer(offset):
+        writes = violations = 0
+        hook = lambda instance, name, old, new: None
+        try:
+            while not stop.is_set():
+                Person['set']('stressed', writes)
+                TA['watch'](hook)
+                TA['unwatch'](hook)
+                ta = shared[writes % len(shared)]
+                ta['get']('setId')(ta['get']('getId')() % 1000 + offset * 1000 + 1)
+                writes += 1
+        except Exception:
+            violations += 1
+        with counts_lock:
+            counts['writes'] += writes
+            counts['violations'] += violations
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    workers += [threading.Thread(target=writer, args=(i + 1,)) for i in range(max(1, threads // 4))]
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    for ta in shared:
+        if ta not in byId['find'](ta['get']('getId')()):
+            counts['violations'] += 1
+    byId['drop']()
+    return counts
 
 # Test classes
 def test_MyDate():
@@ -666,9 +559,1693 @@ def test_TA ():
     print("-------------------------------------------------------------------------------------------------------------")
 
 
+def test_ColumnStore():
+    print("---------------------------------------------Test column store-----------------------------------------------")
+    students = make_column_store(Student)
+    students['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'swe', 100, 3)
+    students['new']('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 7987, 'math', 90, 2)
+    students['append'](Student['new']('Dana', 'Levi', Date['new'](1, 1, 2001), 1234, 'swe', 80, 1))
+
+    print(students['size']())  # Should print 3
+    print(students['row'](1)['get']('str')())
+    print(students['aggregate']('grades', 'mean', by='faculty'))  # Should print {'swe': 90.0, 'math': 90.0}
+    print(students['filter']({'grades': lambda grades: grades > 85, 'date.year': lambda year: year > 2000}))  # Should print [1]
+
+    students['row'](2)['get']('setGrades')(95)
+    print(students['aggregate']('grades', 'max'))  # Should print 100
+    students['row'](1)['get']('date')['get']('setYear')(2004)
+    print(students['row'](1)['get']('date')['get']('str')(), students['filter']({'date.day': lambda day: 1 <= day <= 30}))  # Should print 15.3.2004 [0, 1, 2]
+    faculty = make_column_store(Faculty)
+    print(faculty['new']('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 7987, 'math', 30000.5, 2)['get']('getSalary')())  # Should print 30000.5
+    students['row'](0)['get']('setGrades')(92.5)
+    print(students['row'](0)['get']('getGrades')(), students['row'](1)['get']('getGrades')())  # Should print 92.5 90.0
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Roster():
+    print("---------------------------------------------Test roster I/O-------------------------------------------------")
+    import io
+    myTa = TA['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'software_e', 100, 3, 'swe', 30000, 3)
+
+    for format in ('csv', 'jsonl'):
+        file = io.StringIO()
+        write_roster(file, TA, [myTa, myTa], format)
+        print(file.getvalue().splitlines()[-1])
+        file.seek(0)
+        loaded = list(read_roster(file, TA, format))
+        print(len(loaded), loaded[0]['get']('repr')())  # Should print 2 and the same TA
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_RenderCache():
+    print("---------------------------------------------Test render cache-----------------------------------------------")
+    myDate = Date['new'](15, 12, 1999)
+    myStudent = cache_rendering(Student['new']('shulamit', 'Mor yossef', myDate, 206576977, 'swe', 100, 3))
+
+    print(myStudent['get']('str')() is myStudent['get']('str')())  # Should print True
+    myStudent['get']('setGrades')(95)
+    print(myStudent['get']('getAttributes')())  # Should print swe, 95, 3
+    myDate['get']('setYear')(2000)
+    print(myStudent['get']('repr')())  # Should print the new grades and year
+
+    classmates = [cache_rendering(Student['new']('Dana', 'Levi', myDate, i + 1, 'swe', 90, 1)) for i in range(1500)]
+    print(len({classmate['get']('str')() for classmate in classmates}))  # Should print 1500
+    myDate['get']('setYear')(2001)
+    print(classmates[-1]['get']('str')().count('2001'))  # Should print 1
+    del classmates
+    gc.collect()
+    print(len(myDate['render_listeners']))  # Should print 1
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Index():
+    print("---------------------------------------------Test indexes----------------------------------------------------")
+    byId = make_index(Person, 'id')
+    byGrades = make_index(Student, 'grades', ordered=True)
+
+    myStudent = Student['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'swe', 100, 3)
+    myTa = TA['new']('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 7987, 'math', 90, 2, 'swe', 30000, 1)
+
+    print(byId['find'](7987)[0]['get']('getFirstName')())  # Should print Hodaya
+    myTa['get']('setId')(1234)
+    print(byId['find'](7987), len(byId['find'](1234)))  # Should print [] 1
+    print([student['get']('getGrades')() for student in byGrades['range'](85, 95)])  # Should print [90]
+
+    byYear = make_index(Person, 'date.year', ordered=True)
+    byLastName = make_index(Person, 'lastName', key=str.lower)
+    people = [Person['new']('Dana', 'Levi', Date['new'](1, 1, 2001), 11), Person['new']('Yael', 'LEVI', Date['new'](3, 3, 1998), 12)]
+    print([person['get']('getId')() for person in byYear['range'](2000, 2005)], len(byLastName['find']('levi')))  # Should print [11] 2
+    print(make_query(people, Person)['where']('date.year', '<=', 2000)['explain']())  # Should print index on 'date.year' for date.year <= 2000
+    size = byYear['size']()
+    people.pop()
+    gc.collect()
+    print(size - byYear['size'](), len(byLastName['find']('levi')))  # Should print 1 1
+    byDate = make_index(Person, 'date')
+    try:
+        Person['new']('Noa', 'Cohen', Date['new'](2, 2, 2002), 13)
+    except TypeError as error:
+        print(error)  # Should print Index on 'date' cannot hold a dict; index a path into it, such as 'date.year', or give a key function
+    byDate['drop']()
+
+    byId['drop']()
+    byGrades['drop']()
+    byYear['drop']()
+    byLastName['drop']()
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Profiling():
+    print("---------------------------------------------Test profiling--------------------------------------------------")
+    enable_profiling()
+    myTa = TA['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'software_e', 100, 3, 'swe', 30000, 3)
+    for _ in range(3):
+        myTa['get']('getFirstName')()
+    myTa['get']('nothing')
+    profile = disable_profiling()
+
+    snapshot = profile_snapshot(profile)
+    print(snapshot['lookups']['TA.getFirstName'])  # Should print 1 class hit answered by Person at depth 3, then 2 instance hits
+    print(snapshot['lookups']['TA.nothing']['miss_rate'])  # Should print 1.0
+    profile_report(profile, top=3)
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_FrozenDate():
+    print("---------------------------------------------Test frozen dates-----------------------------------------------")
+    myDate = FrozenDate['new'](15, 12, 1999)
+
+    print(myDate is FrozenDate['new'](15, 12, 1999))  # Should print True
+    print(myDate['get']('str')(), myDate['get']('getOrdinal')(), myDate['key'])  # Should print 15.12.1999 19991215 (15, 12, 1999)
+    try:
+        myDate['get']('setDay')(11)
+    except AttributeError as error:
+        print(error)  # Should print Cannot set 'day' on a frozen instance
+
+    Value = make_class({'__init__': lambda self, value: self['set']('value', value)}, frozen=True, intern=True)
+    print(Value['new'](1)['get']('value'), Value['new'](2)['get']('value'), Value['new'](2) is Value['new'](2))  # Should print 1 2 True
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Concurrency():
+    print("---------------------------------------------Test concurrency------------------------------------------------")
+    counts = stress_concurrency(threads=4, seconds=0.5)
+    print(counts['violations'])  # Should print 0
+    print(counts['reads'] > 0 and counts['writes'] > 0)  # Should print True
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Parallel():
+    print("---------------------------------------------Test parallel processing----------------------------------------")
+    import operator
+    from diamond.parallel import parallel_filter, parallel_reduce  # loads the process pool
+    myDate = Date['new'](15, 12, 1999)
+    faculty = [Faculty['new']('shulamit', 'Mor yossef', myDate, i + 1, 'swe', 1000 * (i + 1), i % 5) for i in range(20)]
+
+    print(load_instance(dump_instance(faculty[0]))['get']('repr')() == faculty[0]['get']('repr')())  # Should print True
+    print(parallel_reduce(operator.add, faculty, 0, mapper=payroll, workers=2))  # Should print 210000
+    print(len(parallel_filter(is_senior, faculty, workers=2)))  # Should print 8
+    print("-------------------------------------------------------------------------------------------------------------")
+
+def payroll(member):
+    """The yearly salary of a faculty member, used by test_Parallel."""
+    return member['get']('getSalary')()
+
+def is_senior(member):
+    """Whether a faculty member has 3 or more years of seniority, used by test_Parallel."""
+    return member['get']('getSeniority')() >= 3
+
+
+def test_Snapshot():
+    print("---------------------------------------------Test snapshots--------------------------------------------------")
+    import os
+    import tempfile
+    myDate = Date['new'](15, 12, 1999)
+    myTa = TA['new']('shulamit', 'Mor yossef', myDate, 206576977, 'software_e', 95.5, 2, 'swe', 30000, 5)
+    student = Student['new']('Hodaya', 'Shirazie', FrozenDate['new'](15, 3, 2003), 7987, 'math', 100, 4)
+    person = Person['new']('Dana', 'Levi', myDate, 42)
+
+    path = os.path.join(tempfile.mkdtemp(), 'population.snap')
+    print(write_snapshot(path, [myTa, student, person]))  # Should print 3
+    snapshot = load_snapshot(path)
+    print(snapshot['field'](1, 'lastName'))  # Should print Shirazie
+    for position, original in enumerate([myTa, student, person]):
+        loaded = snapshot['row'](position)
+        print(loaded['class'] is original['class'], loaded['get']('repr')() == original['get']('repr')())  # Should print True True
+    print(snapshot['row'](1)['get']('date') is FrozenDate['new'](15, 3, 2003))  # Should print True
+    print(snapshot['row'](0)['get']('getStudentSeniority')(), snapshot['row'](0)['get']('getFacultySeniority')())  # Should print 2 5
+    snapshot['close']()
+    os.remove(path)
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_LazyInstance():
+    print("---------------------------------------------Test lazy instances---------------------------------------------")
+    import os
+    import tempfile
+    students = make_column_store(Student)
+    students['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'swe', 100, 3)
+    reads = []
+    source = dict(students, field=lambda index, name: reads.append(name) or students['field'](index, name))
+
+    lazy = make_lazy_instance(Student, source, 0)
+    print(lazy['get']('getLastName')(), lazy['get']('getLastName')(), reads)  # Should print Mor yossef Mor yossef ['lastName']
+    lazy['get']('setGrades')(95)
+    print(lazy['dirty'](), students['field'](0, 'grades'))  # Should print {'grades': 95} 100
+    lazy['flush']()
+    print(students['field'](0, 'grades'), lazy['dirty']())  # Should print 95 {}
+    print(make_lazy_instance(Student, students, 0)['get']('repr')() == students['row'](0)['get']('repr')())  # Should print True
+    regular = make_lazy_instance(Student, students, 0)['materialize']()
+    regular['get']('date')['get']('setYear')(2010)
+    print(students['row'](0)['get']('date')['get']('getYear')(), regular['get']('date')['get']('getYear')())  # Should print 1999 2010
+
+    path = os.path.join(tempfile.mkdtemp(), 'population.snap')
+    myTa = TA['new']('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 7987, 'math', 90, 2, 'swe', 30000, 2)
+    write_snapshot(path, [myTa])
+    snapshot = load_snapshot(path)
+    lazy = snapshot['lazy'](0)
+    print(lazy['class'] is TA, lazy['get']('getGrades')())  # Should print True 90
+    print(lazy['materialize']()['get']('repr')() == myTa['get']('repr')())  # Should print True
+    snapshot['close']()
+    os.remove(path)
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Diamond():
+    print("---------------------------------------------Test diamond state----------------------------------------------")
+    sets = []
+    watcher = lambda instance, name, old, new: sets.append(name)
+    TA['watch'](watcher)
+    myTa = TA['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'software_e', 100, 2, 'swe', 30000, 5)
+    TA['unwatch'](watcher)
+
+    print(sets.count('firstName'))  # Should print 1
+    print(myTa['get']('getStudentSeniority')(), myTa['get']('getFacultySeniority')())  # Should print 2 5
+    myTa['get']('setFacultySeniority')(6)
+    print(myTa['get']('getSeniority')(), myTa['get']('getFacultySeniority')())  # Should print 2 6
+    print(myTa['get']('repr')())  # Should end with swe, 30000, 6)
+    print(sorted(TA['renames'].items()))  # Should print [('Faculty', {'seniority': 'Faculty.seniority'})]
+    print(make_column_store(TA)['new']('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 7987, 'math', 90, 1, 'swe', 27000, 4)['get']('getFacultySeniority')())  # Should print 4
+
+    bySeniority = make_index(Faculty, 'seniority')
+    senior = TA['new']('Dana', 'Levi', Date['new'](1, 1, 2001), 1234, 'math', 90, 1, 'swe', 27000, 9)
+    print(len(bySeniority['find'](9)), len(bySeniority['find'](1)))  # Should print 1 0
+    print(make_query([myTa, senior], Faculty)['where']('seniority', '==', 9)['count']())  # Should print 1
+    bySeniority['drop']()
+    print(make_query([myTa, senior], Faculty)['where']('seniority', '>', 5)['count']())  # Should print 2
+
+    stack = [make_class({'tag': lambda self: 'top'})]
+    for _ in range(24):  # every level is a diamond, reached through both of its bases
+        stack.append(make_class({}, [make_class({}, [stack[-1]]), make_class({}, [stack[-1]])]))
+    stack[0]['set']('tag', lambda self: 'changed')
+    print(stack[-1]['get']('tag')(None))  # Should print changed
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Query():
+    print("---------------------------------------------Test queries----------------------------------------------------")
+    byFaculty = make_index(Person, 'faculty')
+    students = [Student['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'swe', 100, 3),
+                Student['new']('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 7987, 'swe', 95, 2),
+                Student['new']('Dana', 'Levi', Date['new'](1, 1, 2001), 1234, 'math', 98, 1),
+                TA['new']('Noa', 'Cohen', Date['new'](2, 2, 2002), 4321, 'swe', 92, 2, 'swe', 30000, 1)]
+    people = students + [Person['new']('Yael', 'Katz', Date['new'](3, 3, 2003), 99)]
+
+    query = make_query(people, Student)['where']('faculty', '==', 'swe')['where']('grades', '>', 90)['where']('date.year', '>', 2000)
+    print(query['explain']())  # Should print index on 'faculty' for faculty == 'swe'
+    print(make_query(people, Student)['where']('faculty', 'in', ['math', 'math'])['count']())  # Should print 1
+    print(list(query['order_by']('grades', reverse=True)['select']('lastName', 'grades')['rows']()))  # Should print [('Shirazie', 95), ('Cohen', 92)]
+    print(list(make_query(people, Person)['group_by']('date.year')['select']('firstName')['limit'](2)['rows']()))  # Should print the first two birth years
+    print(make_query(people, TA)['where']('grades', '>', 0)['count']())  # Should print 1
+    print(make_query(people, Person)['where']('faculty', '==', 'swe')['limit'](2)['count']())  # Should print 2
+    print(make_query(people, Person)['group_by']('faculty')['count']())  # Should print 3 (swe, math and None)
+
+    byLastName = make_index(Person, 'lastName')  # covers none of the people above
+    katz = make_query(people + [Person['new']('Avi', 'Katz', Date['new'](4, 4, 2004), 100)], Person)['where']('lastName', '==', 'Katz')
+    print(katz['explain'](), katz['count']())  # Should print scan 2
+    byLastName['add'](people)
+    print(katz['explain'](), katz['count']())  # Should print index on 'lastName' for lastName == 'Katz' 2
+    byLastName['drop']()
+
+    store = make_column_store(Student)
+    store['new_many']([('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'swe', 100, 3),
+                       ('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 7987, 'swe', 95, 2)])
+    print(list(make_query(store)['where']('grades', '>', 90)['where']('date.year', '>', 2000)['select']('firstName')['rows']()))  # Should print [('Hodaya',)]
+    byFaculty['drop']()
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_LazyClasses():
+    print("---------------------------------------------Test lazy classes-----------------------------------------------")
+    built = len(CLASSES)
+    classes = define_classes([
+        {'name': 'Seminar', 'bases': ['Course'], 'fields': ['room']},
+        {'name': 'Course', 'attributes': {'str': lambda self: f"{self['get']('title')} ({self['get']('credits')})"},
+         'fields': ['title', make_field('credits', lambda credits: credits > 0, default=3)]},
+    ])
+    print(len(CLASSES) - built)  # Should print 0
+    seminar = classes['Seminar']['new']()
+    seminar['get']('setTitle')('Compilers')
+    seminar['get']('setCredits')(-1)
+    print(seminar['get']('str')(), len(CLASSES) - built)  # Should print Compilers (3) 2
+    print(get_class('Course') is classes['Course'], classes['Seminar']['mro']()[1] is classes['Course'])  # Should print True True
+
+    orphan = define_classes([{'name': 'Workshop', 'bases': ['Lab'], 'fields': ['hours']}])['Workshop']
+    for _ in range(2):
+        try:
+            orphan['new']
+        except KeyError as error:
+            print(error)  # Should print "No class named 'Lab' is registered" twice
+    define_classes([{'name': 'Lab', 'fields': ['bench']}])
+    print(orphan['new']()['get']('getHours')())  # Should print None
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Batch():
+    print("---------------------------------------------Test batches----------------------------------------------------")
+    byGrades = make_index(Student, 'grades', ordered=True)
+    myDate = Date['new'](15, 12, 1999)
+    students = [Student['new']('shulamit', 'Mor yossef', myDate, 206576977 + i, 'swe', 80, 1) for i in range(3)]
+    myTa = TA['new']('Hodaya', 'Shirazie', myDate, 7987, 'math', 90, 2, 'swe', 30000, 2)
+
+    batch = make_batch()
+    batch['update_many'](students, 'grades', [91, 92, 93])
+    batch['update_many'](students, 'seniority', 2)
+    batch['update'](myTa, 'Faculty.seniority', 5)
+    print(len(batch['commit']()))  # Should print 7
+    print([student['get']('getGrades')() for student in students], myTa['get']('getFacultySeniority')())  # Should print [91, 92, 93] 5
+    print(len(list(byGrades['range'](91, 93))))  # Should print 3
+
+    invalid = make_batch()
+    invalid['update'](students[0], 'grades', 50)
+    invalid['update'](students[1], 'id', -5)
+    try:
+        invalid['commit']()
+    except ValueError as error:
+        print(error)  # Should print Invalid value for Student.id: -5
+    print(students[0]['get']('getGrades')())  # Should print 91
+
+    batch['rollback']()
+    print([student['get']('getGrades')() for student in students], myTa['get']('getFacultySeniority')())  # Should print [80, 80, 80] 2
+    print(len(list(byGrades['range'](91, 93))))  # Should print 0
+    byGrades['drop']()
+
+    def refuse(instance, name, old, new):
+        if new == 77:
+            raise RuntimeError('refused 77')
+    Student['watch'](refuse)
+    failing = make_batch()
+    failing['update'](students[0], 'grades', 85)
+    failing['update'](students[1], 'grades', 77)
+    try:
+        failing['commit']()
+    except RuntimeError as error:
+        print(error)  # Should print refused 77
+    Student['unwatch'](refuse)
+    print([student['get']('getGrades')() for student in students])  # Should print [80, 80, 80]
+
+    extra = make_batch()
+    extra['update'](myTa, 'nickname', 'Hodi')
+    print(extra['commit']()[0][2])  # Should print None
+    years = make_batch()
+    years['update'](myDate, 'year', 2005)
+    years['commit']()
+    print(myDate['get']('str')(), myDate['get']('getOrdinal')())  # Should print 15.12.2005 20051215
+    years['rollback']()
+    print(myDate['get']('getOrdinal')())  # Should print 19991215
+
+    frozen = make_batch()
+    frozen['update'](FrozenDate['new'](1, 1, 2000), 'day', 5)
+    try:
+        frozen['commit']()
+    except AttributeError as error:
+        print(error)  # Should print Cannot set 'day' on a frozen instance
+    print(FrozenDate['new'](1, 1, 2000)['key'])  # Should print (1, 1, 2000)
+    cached = cache_rendering(Person['new']('Dana', 'Levi', myDate, 1))
+    cached['get']('repr')()
+    renamed = make_batch()
+    renamed['update'](cached, 'lastName', 'Cohen')
+    renamed['commit']()
+    print('Cohen' in cached['get']('repr')())  # Should print True
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Compiled():
+    print("---------------------------------------------Test compiled classes-------------------------------------------")
+    myDate = Date['new'](15, 12, 1999)
+    cases = [(Person, ('shulamit', 'Mor yossef', myDate, 206576977)),
+             (Student, ('shulamit', 'Mor yossef', myDate, 206576977, 'software_e', 100, 3)),
+             (Faculty, ('shulamit', 'Mor yossef', myDate, 206576977, 'swe', 30000, 3)),
+             (TA, ('shulamit', 'Mor yossef', myDate, 206576977, 'software_e', 100, 2, 'swe', 30000, 5))]
+    for cls, args in cases:
+        native = compile_class(cls)
+        original, compiled = cls['new'](*args), native['new'](*args)
+        for name in ('str', 'repr', 'getFirstName', 'getId', 'getDate'):
+            assert original['get'](name)() == compiled['get'](name)(), (cls['name'], name)
+        compiled['get']('setId')(-1)  # rejected by the validator, as on the original
+        compiled['get']('setLastName')('Shirazie')
+        print(cls['name'], compiled.lastName, compiled.getId(), compiled['class'] is cls)  # Should print <name> Shirazie 206576977 True
+
+    myTa = compile_class(TA)['new'](*cases[3][1])
+    print(myTa.getStudentSeniority(), myTa.getFacultySeniority(), myTa.Faculty__seniority)  # Should print 2 5 5
+    myTa['get']('setFacultySeniority')(6)
+    print(myTa['get']('getSeniority')(), myTa['get']('getFacultySeniority')())  # Should print 2 6
+
+    byId = make_index(Person, 'id')
+    person = compile_class(Person)['new']('Hodaya', 'Shirazie', myDate, 7987)
+    person.setId(1234)
+    print(byId['find'](1234) == [person], str(person) == person['get']('str')())  # Should print True True
+    byId['drop']()
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Acyclic():
+    print("---------------------------------------------Test acyclic instances------------------------------------------")
+    import weakref
+    AcyclicStudent = make_class({}, [Student], acyclic=True)
+    myDate = Date['new'](15, 12, 1999)
+    args = ('shulamit', 'Mor yossef', myDate, 206576977, 'swe', 100, 3)
+    student, regular = AcyclicStudent['new'](*args), Student['new'](*args)
+
+    print(student['get']('str')() == regular['get']('str')(), student['get']('repr')() == regular['get']('repr')())  # Should print True True
+    student['get']('setGrades')(95)
+    student['get']('setId')(-1)
+    print(student['get']('getGrades')(), student['get']('getId')())  # Should print 95 206576977
+    print(AcyclicStudent['new'](*args)['get']('getFirstName')())  # Should print shulamit
+
+    collecting = gc.isenabled()
+    gc.disable()
+    alive = weakref.ref(student)
+    del student
+    print(alive() is None, len(AcyclicStudent['new_many']([args] * 3)))  # Should print True 3
+    if collecting:
+        gc.enable()
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_DateOrdinals():
+    print("---------------------------------------------Test date ordinals----------------------------------------------")
+    myDate = Date['new'](15, 12, 1999)
+    print(myDate['get']('getOrdinal')())  # Should print 19991215
+    myDate['get']('setYear')(2001)
+    myDate['get']('setMonth')(13)
+    print(myDate['get']('getOrdinal')())  # Should print 20011215
+    myDate['get']('setOrdinal')(20030312)
+    print(myDate['get']('str')())  # Should print 12.3.2003
+    changes = []
+    watcher = lambda instance, name, old, new: changes.append((name, new))
+    Date['watch'](watcher)
+    myDate['get']('setDay')(20)
+    Date['unwatch'](watcher)
+    print(changes)  # Should print [('day', 20), ('ordinal', 20030320)]
+
+    people = [Person['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 1),
+              Person['new']('Hodaya', 'Shirazie', Date['new'](15, 3, 2003), 2),
+              Person['new']('Dana', 'Levi', Date['new'](1, 1, 2001), 3)]
+    ordinals = date_ordinals(people, 'date')
+    print([person['get']('getId')() for person in sort_by_date(people)])  # Should print [1, 3, 2]
+    print(list(ages(ordinals, Date['new'](15, 3, 2021))))  # Should print [21, 18, 20]
+    print(dates_between(ordinals, Date['new'](1, 1, 2000), 20031231), bucket_dates(ordinals, 'year'))  # Should print [1, 2] {1999: [0], 2001: [2], 2003: [1]}
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_Clone():
+    print("---------------------------------------------Test clone------------------------------------------------------")
+    myDate = Date['new'](15, 12, 1999)
+    ta = TA['new']('shulamit', 'Mor yossef', myDate, 206576977, 'swe', 100, 3, 'python', 15000, 2)
+    promoted = TA['clone'](ta, **{'Faculty.seniority': 5})
+    print(promoted['get']('getFacultySeniority')(), ta['get']('getFacultySeniority')())  # Should print 5 2
+    print(promoted['get']('date') is myDate, promoted['get']('str')() == ta['get']('str')())  # Should print True False
+    raise_ = Person['clone'](promoted, salary=16000)
+    print(raise_['class'] is TA, raise_['get']('getSalary')(), promoted['get']('getSalary')())  # Should print True 16000 15000
+
+    index = make_index(Faculty, 'salary')
+    faculty = Faculty['new']('Hodaya', 'Shirazie', myDate, 1, 'java', 12000, 4)
+    Faculty['clone'](faculty, salary=13000)
+    print(len(index['find'](12000)), len(index['find'](13000)))  # Should print 1 1
+    index['drop']()
+    frozen = FrozenDate['new'](15, 12, 1999)
+    print(FrozenDate['clone'](frozen) is frozen)  # Should print True
+
+    students = make_column_store(Student)
+    row = students['new']('Dana', 'Levi', Date['new'](1, 1, 2001), 3, 'math', 90, 1)
+    moved = Student['clone'](row, faculty='physics')
+    lazy = Student['clone'](make_lazy_instance(Student, students, 0), grades=95)
+    print(moved['get']('getFaculty')(), row['get']('getFaculty')(), lazy['get']('getGrades')(), 'storage' in lazy)  # Should print physics math 95 True
+    try:
+        Student['clone'](faculty)
+    except TypeError as error:
+        print(error)  # Should print Cannot clone an instance of 'Faculty' as 'Student'
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+def test_AsyncIngest():
+    print("---------------------------------------------Test async ingestion--------------------------------------------")
+    import asyncio
+    import io
+    myTa = TA['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), 206576977, 'software_e', 100, 3, 'swe', 30000, 3)
+    file = io.StringIO()
+    write_roster(file, TA, [myTa] * 5, 'csv')
+    data = file.getvalue().encode()
+
+    async def ingest(executor=None):
+        stream = asyncio.StreamReader()
+        stream.feed_data(data[:100])  # the rest arrives later, cut mid-line
+
+        async def arrive():
+            await asyncio.sleep(0.01)
+            stream.feed_data(data[100:])
+            stream.feed_eof()
+
+        arrival = asyncio.ensure_future(arrive())
+        loaded = [instance async for instance in ingest_roster(stream, TA, batch_size=2, executor=executor)]
+        await arrival
+        return loaded
+
+    loaded = asyncio.run(ingest())
+    print(len(loaded), loaded[-1]['get']('repr')() == myTa['get']('repr')())  # Should print 5 True
+
+    async def stop_early():
+        stream = asyncio.StreamReader()
+        stream.feed_data(data)
+        stream.feed_eof()
+        instances = ingest_roster(stream, TA, batch_size=2, max_pending=1)
+        async for instance in instances:
+            break
+        await asyncio.wait_for(instances.aclose(), 1)
+        return instance
+
+    print(asyncio.run(stop_early())['get']('getId')())  # Should print 206576977
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(1) as executor:
+        print(len(asyncio.run(ingest(executor))))  # Should print 5
+    print("-------------------------------------------------------------------------------------------------------------")
+
+
+# Benchmarks
+def best_rate(call, n, repeat=3):
+    """
+    Time n calls of a function and return the best calls-per-second rate over several runs.
+
+    Args:
+        call (callable): The function to call, with no arguments.
+        n (int): Calls per run.
+        repeat (int): Number of runs; a full collection runs before each one.
+
+    Returns:
+        float: Calls per second of the fastest run.
+    """
+    elapsed = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(n):
+            call()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return n / elapsed
+
+def sample_args():
+    """Return constructor arguments for one instance of each of the file's classes, keyed by class name."""
+    date = Date['new'](15, 12, 1999)
+    person = ('shulamit', 'Mor yossef', date, 206576977)
+    return {'MyDate': (Date, (15, 12, 1999)), 'Person': (Person, person),
+            'Student': (Student, person + ('swe', 100, 3)), 'Faculty': (Faculty, person + ('swe', 30000, 3)),
+            'TA': (TA, person + ('software_e', 100, 3, 'swe', 30000, 3))}
+
+def bench_construction(n=100_000):
+    """
+    Measure 'new' throughput and memory per instance for every class.
+
+    Args:
+        n (int): Instances built per class.
+
+    Returns:
+        dict: Instances per second and bytes per instance for each class.
+    """
+    import tracemalloc
+    print("---------------------------------------------Bench construction----------------------------------------------")
+    results = {}
+    for name, (cls, args) in sample_args().items():
+        rate = best_rate(lambda: cls['new'](*args), n)
+        tracemalloc.start()
+        population = [cls['new'](*args) for _ in range(n // 10 or 1)]
+        per_instance = tracemalloc.get_traced_memory()[0] / len(population)
+        tracemalloc.stop()
+        del population
+        results[name] = {'instances_per_sec': rate, 'bytes_per_instance': per_instance}
+        print(f'{name:8} {rate:14,.0f} instances/s {per_instance:10,.1f} bytes/instance')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+def bench_attribute_access(n=1_000_000):
+    """
+    Measure get/set latency at the instance level, on the defining class and through inheritance, including the TA diamond.
+
+    Args:
+        n (int): Calls per case.
+
+    Returns:
+        dict: Nanoseconds per call for each case.
+    """
+    print("---------------------------------------------Bench attribute access------------------------------------------")
+    args = sample_args()
+    student = Student['new'](*args['Student'][1])
+    ta = TA['new'](*args['TA'][1])
+    cases = {'instance get field': lambda: student['get']('grades'),
+             'instance set field': lambda: student['set']('grades', 90),
+             'instance get undeclared': lambda: student['get']('nickname'),
+             'class get own': lambda: Student['get']('getGrades'),
+             'class get inherited': lambda: Student['get']('getFirstName'),
+             'TA class get diamond': lambda: TA['get']('getSeniority'),
+             'TA class get inherited': lambda: TA['get']('getFirstName'),
+             'TA instance get method': lambda: ta['get']('getFirstName'),
+             'TA method call': lambda: ta['get']('getFirstName')(),
+             'TA unbound method call': lambda: bind_method(TA['get']('getAttributes'), ta)()}
+    student['set']('nickname', 'shuli')
+    results = {}
+    for case, call in cases.items():
+        ns = 1e9 / best_rate(call, n)
+        results[case] = {'ns_per_call': ns}
+        print(f'{case:26} {ns:10,.1f} ns/call')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+def bench_hierarchy(n=200_000, depths=(1, 4, 16, 64), widths=(1, 4, 16)):
+    """
+    Measure how class creation and lookups scale with synthetic hierarchy depth and width.
+
+    A chain of 'depth' classes defines 'method' at its root. A class with 'width'
+    direct bases defines it in the last base only.
+
+    Args:
+        n (int): Lookups per case.
+        depths (tuple): Chain lengths to try.
+        widths (tuple): Numbers of direct bases to try.
+
+    Returns:
+        dict: Class creation time, class lookup and cold instance lookup latency for each shape.
+    """
+    print("---------------------------------------------Bench hierarchy shape-------------------------------------------")
+
+    def method(self):
+        return 1
+
+    def measure(shape, build):
+        start = time.perf_counter()
+        leaf = build()
+        create_us = (time.perf_counter() - start) * 1e6
+        class_ns = 1e9 / best_rate(lambda: leaf['get']('method'), n)
+        cold_ns = 1e9 / best_rate(lambda: make_instance(leaf)['get']('method'), n // 10 or 1)
+        results[shape] = {'create_us': create_us, 'class_get_ns': class_ns, 'cold_instance_get_ns': cold_ns}
+        print(f'{shape:10} create {create_us:10,.1f} us  class get {class_ns:8,.1f} ns  cold instance get {cold_ns:8,.1f} ns')
+
+    def chain(depth):
+        cls = make_class({'method': method})
+        for _ in range(depth - 1):
+            cls = make_class({}, [cls])
+        return cls
+
+    def wide(width):
+        bases = [make_class({}) for _ in range(width - 1)] + [make_class({'method': method})]
+        return make_class({}, bases)
+
+    results = {}
+    for depth in depths:
+        measure(f'depth={depth}', lambda: chain(depth))
+    for width in widths:
+        measure(f'width={width}', lambda: wide(width))
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+def bench_bound_methods(n=1_000_000):
+    """
+    Compare repeated method access with and without the per-instance bound-method cache.
+
+    The uncached path re-binds the class function on every access, exactly as every
+    lookup did before the cache existed. Closure allocations are counted by wrapping
+    bind_method for the duration of each run.
+
+    Args:
+        n (int): Number of method calls per object and per path.
+
+    Returns:
+        dict: Calls per second and closures allocated for each class and path.
+    """
+    print("---------------------------------------------Bench bound methods---------------------------------------------")
+    original = core.bind_method
+    allocated = [0]
+
+    def counting_bind(method_name, instance):
+        if callable(method_name):
+            allocated[0] += 1
+        return original(method_name, instance)
+
+    date = Date['new'](15, 12, 1999)
+    objects = {'Student': Student['new']('shulamit', 'Mor yossef', date, 206576977, 'swe', 100, 3),
+               'TA': TA['new']('shulamit', 'Mor yossef', date, 206576977, 'software_e', 100, 3, 'swe', 30000, 3)}
+    results = {}
+    core.bind_method = counting_bind
+    try:
+        for name, obj in objects.items():
+            cls = Student if name == 'Student' else TA
+            for path in ('uncached', 'cached'):
+                allocated[0] = 0
+                start = time.perf_counter()
+                if path == 'uncached':
+                    for _ in range(n):
+                        core.bind_method(cls['get']('getAttributes'), obj)()
+                else:
+                    for _ in range(n):
+                        obj['get']('getAttributes')()
+                elapsed = time.perf_counter() - start
+                results[f'{name}.{path}'] = {'calls_per_sec': n / elapsed, 'closures': allocated[0]}
+                print(f'{name:8} {path:9} {n / elapsed:14,.0f} calls/s {allocated[0]:>10,} closures')
+    finally:
+        core.bind_method = original
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+def bench_instance_memory(n=100_000):
+    """
+    Measure memory per instance for the dict-per-instance layout and the declared-field record layout.
+
+    The dict layout is measured on field-less twins of Person and Student that share
+    the same methods, so the only difference is how instance state is stored.
+
+    Args:
+        n (int): Number of instances to build per class and layout.
+
+    Returns:
+        dict: Bytes per instance for each class and layout.
+    """
+    import tracemalloc
+    print("---------------------------------------------Bench instance memory-------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    person_args = ('shulamit', 'Mor yossef', date, 206576977)
+    student_args = person_args + ('swe', 100, 3)
+    dict_person = make_class(dict(Person['attributes']()))
+    dict_student = make_class(dict(Student['attributes']()), [dict_person])
+    cases = [('Person', 'dict', dict_person, person_args), ('Person', 'record', Person, person_args),
+             ('Student', 'dict', dict_student, student_args), ('Student', 'record', Student, student_args)]
+    results = {}
+    for name, layout, cls, args in cases:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        population = [cls['new'](*args) for _ in range(n)]
+        per_instance = (tracemalloc.get_traced_memory()[0] - before) / n
+        tracemalloc.stop()
+        del population
+        results[f'{name}.{layout}'] = {'bytes_per_instance': per_instance}
+        print(f'{name:8} {layout:7} {per_instance:10,.1f} bytes/instance')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_new_many(n=200_000, repeat=3):
+    """
+    Compare roster construction throughput of a per-row 'new' loop, 'new_many' and 'new_many' into a column store.
+
+    Args:
+        n (int): Number of Student rows to build per path.
+        repeat (int): Runs per path; the fastest one is reported.
+
+    Returns:
+        dict: Instances per second for each path.
+    """
+    print("---------------------------------------------Bench new_many--------------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    rows = [('shulamit', 'Mor yossef', date, i + 1, 'swe', 100, 3) for i in range(n)]
+    paths = {'new loop': lambda: [Student['new'](*args) for args in rows],
+             'new_many': lambda: Student['new_many'](rows),
+             'new_many into store': lambda: Student['new_many'](rows, into=make_column_store(Student))}
+    results = {}
+    for path, build in paths.items():
+        elapsed = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            build()
+            elapsed = min(elapsed, time.perf_counter() - start)
+        results[path] = {'instances_per_sec': n / elapsed}
+        print(f'{path:20} {n / elapsed:14,.0f} instances/s')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+def bench_rendering(n=50_000, repeat=5):
+    """
+    Compare repeated 'str' and 'repr' rendering of a Student population with and without cache_rendering.
+
+    The first pass over the population (which fills the cache) is reported
+    separately from the following passes.
+
+    Args:
+        n (int): Number of students in the population.
+        repeat (int): How many times the whole population is rendered.
+
+    Returns:
+        dict: Renders per second of the first pass and of the repeated passes, for each method and path.
+    """
+    print("---------------------------------------------Bench rendering-------------------------------------------------")
+    rows = [('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), i + 1, 'swe', 100, 3) for i in range(n)]
+    populations = {'uncached': Student['new_many'](rows),
+                   'cached': [cache_rendering(student) for student in Student['new_many'](rows)]}
+    results = {}
+    for method in ('str', 'repr'):
+        for path, population in populations.items():
+            passes = []
+            for _ in range(repeat):
+                gc.collect()
+                start = time.perf_counter()
+                for student in population:
+                    student['get'](method)()
+                passes.append(time.perf_counter() - start)
+            first = n / passes[0]
+            repeated = n * (repeat - 1) / sum(passes[1:])
+            results[f'{method}.{path}'] = {'first_pass_renders_per_sec': first, 'renders_per_sec': repeated}
+            print(f'{method:5} {path:9} first pass {first:12,.0f} renders/s   repeated {repeated:12,.0f} renders/s')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_accessors(n=1_000_000):
+    """
+    Compare generated field accessors with handwritten ones on the same record layout.
+
+    The handwritten class defines getDay/setDay the way the classes in this file
+    used to, which makes make_class keep them instead of generating its own.
+
+    Args:
+        n (int): Number of calls per accessor and path.
+
+    Returns:
+        dict: Calls per second for each accessor and path.
+    """
+    print("---------------------------------------------Bench accessors-------------------------------------------------")
+
+    def getDay(self):
+        return self['get']('day')
+
+    def setDay(self, day):
+        if 1 <= day <= 30:
+            self['set']('day', day)
+
+    handwritten = make_class({'__init__': Date['get']('__init__'), 'getDay': getDay, 'setDay': setDay}, fields=['day', 'month', 'year'])
+    dates = {'handwritten': handwritten['new'](15, 12, 1999), 'generated': Date['new'](15, 12, 1999)}
+    results = {}
+    for path, date in dates.items():
+        for accessor, call in (('getDay', lambda: date['get']('getDay')()), ('setDay', lambda: date['get']('setDay')(12))):
+            start = time.perf_counter()
+            for _ in range(n):
+                call()
+            elapsed = time.perf_counter() - start
+            results[f'{accessor}.{path}'] = {'calls_per_sec': n / elapsed}
+            print(f'{accessor:7} {path:12} {n / elapsed:14,.0f} calls/s')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_frozen_dates(n=200_000, distinct=3650):
+    """
+    Compare building and sorting birth dates as mutable dates and as interned frozen dates.
+
+    Args:
+        n (int): Number of dates to build.
+        distinct (int): Number of distinct dates among them.
+
+    Returns:
+        dict: Construction rate, bytes per date and sort time for each kind of date.
+    """
+    import tracemalloc
+    print("---------------------------------------------Bench frozen dates----------------------------------------------")
+    values = [(1 + i % 30, 1 + i // 30 % 12, 1990 + i // 360 % 30) for i in range(distinct)]
+    rows = [values[i % distinct] for i in range(n)]
+    results = {}
+    for kind, cls in (('mutable', Date), ('frozen', FrozenDate)):
+        gc.collect()
+        tracemalloc.start()
+        dates = [cls['new'](*args) for args in rows]
+        per_date = tracemalloc.get_traced_memory()[0] / n
+        tracemalloc.stop()
+        del dates
+        gc.collect()
+        start = time.perf_counter()
+        dates = [cls['new'](*args) for args in rows]
+        elapsed = time.perf_counter() - start
+        if kind == 'mutable':
+            key = lambda date: (date['get']('getYear')(), date['get']('getMonth')(), date['get']('getDay')())
+        else:
+            key = lambda date: date['get']('getOrdinal')()
+        start = time.perf_counter()
+        sorted(dates, key=key)
+        sort_ms = (time.perf_counter() - start) * 1000
+        results[kind] = {'dates_per_sec': n / elapsed, 'bytes_per_date': per_date, 'sort_ms': sort_ms}
+        print(f'{kind:8} {n / elapsed:14,.0f} dates/s {per_date:10,.1f} bytes/date   sort {sort_ms:8,.1f} ms')
+        del dates
+    # Interned dates stay alive in the class tables: the memory pass pays for filling them, the timed pass only hits them.
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_concurrent_reads(n=200_000, threads=(1, 2, 4, 8)):
+    """
+    Measure total read throughput on a shared Student population as the number of reader threads grows.
+
+    A writer thread keeps redefining a class attribute of Person during the run,
+    so readers also pay for picking up republished tables. On a GIL build the
+    total stays flat; on a free-threaded build it should grow with the threads.
+
+    Args:
+        n (int): Method calls per reader thread.
+        threads (tuple): Reader thread counts to try.
+
+    Returns:
+        dict: Total calls per second for each thread count, and whether the GIL was enabled.
+    """
+    print("---------------------------------------------Bench concurrent reads------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    population = Student['new_many']([('shulamit', 'Mor yossef', date, i + 1, 'swe', 100, 3) for i in range(1000)])
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    results = {'gil': gil}
+
+    def reader():
+        for i in range(n):
+            population[i % 1000]['get']('getGrades')()
+
+    for count in threads:
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                Person['set']('benchmarked', i)
+                i += 1
+                time.sleep(0.001)
+
+        background = threading.Thread(target=writer)
+        readers = [threading.Thread(target=reader) for _ in range(count)]
+        background.start()
+        start = time.perf_counter()
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        background.join()
+        results[f'threads={count}'] = {'calls_per_sec': n * count / elapsed}
+        print(f'{count:3} readers {n * count / elapsed:14,.0f} calls/s (GIL {"on" if gil else "off"})')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_parallel(n=200_000, workers=None):
+    """
+    Compare a serial payroll computation over a Faculty population with parallel_reduce.
+
+    Each faculty member's net salary goes through a small progressive tax
+    computation, so the work per instance is CPU-bound.
+
+    Args:
+        n (int): Population size.
+        workers (int, optional): Number of processes; defaults to the CPU count.
+
+    Returns:
+        dict: Serial and parallel time, and the parallel time as a fraction of the serial time, which, like
+            the times, is better when lower.
+    """
+    import operator
+    from diamond.parallel import parallel_reduce
+    print("---------------------------------------------Bench parallel payroll------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    faculty = Faculty['new_many']([('shulamit', 'Mor yossef', date, i + 1, 'swe', 20000 + i % 50000, i % 30) for i in range(n)])
+    start = time.perf_counter()
+    serial = reduce(operator.add, map(net_salary, faculty), 0)
+    serial_s = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = parallel_reduce(operator.add, faculty, 0, mapper=net_salary, workers=workers)
+    parallel_s = time.perf_counter() - start
+    assert abs(serial - parallel) < 1e-6 * abs(serial)
+    print(f'serial {serial_s:8.2f} s   parallel {parallel_s:8.2f} s   speedup {serial_s / parallel_s:5.2f}x')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return {'serial_s': serial_s, 'parallel_s': parallel_s, 'parallel_over_serial': parallel_s / serial_s}
+
+def net_salary(member):
+    """A faculty member's salary after a progressive tax and a seniority bonus, used by bench_parallel."""
+    salary = member['get']('getSalary')() * (1 + 0.01 * member['get']('getSeniority')())
+    net = 0.0
+    for low, high, rate in ((0, 10000, 0.1), (10000, 30000, 0.2), (30000, 60000, 0.31), (60000, float('inf'), 0.47)):
+        if salary > low:
+            net += (min(salary, high) - low) * (1 - rate)
+    return net
+
+
+def bench_snapshot(n=200_000):
+    """
+    Compare restarting from a snapshot with rebuilding a TA population from a roster.
+
+    Reports the time to write each file, the time to open it and reach the
+    first instance (cold start), and the time to materialize every instance.
+
+    Args:
+        n (int): Population size.
+
+    Returns:
+        dict: Timings in seconds and file sizes in bytes for both formats.
+    """
+    import os
+    import tempfile
+    print("---------------------------------------------Bench snapshots-------------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    population = TA['new_many']([('shulamit', 'Mor yossef', date, i + 1, 'software_e', 90 + i % 10, i % 5,
+                                  'swe', 20000 + i % 5000, i % 7) for i in range(n)])
+    directory = tempfile.mkdtemp()
+    snapshot_path = os.path.join(directory, 'population.snap')
+    roster_path = os.path.join(directory, 'population.csv')
+    results = {}
+
+    start = time.perf_counter()
+    write_snapshot(snapshot_path, population)
+    results['snapshot_write_s'] = time.perf_counter() - start
+    start = time.perf_counter()
+    with open(roster_path, 'w', newline='') as file:
+        write_roster(file, TA, population)
+    results['roster_write_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = load_snapshot(snapshot_path)
+    snapshot['row'](0)
+    results['snapshot_first_s'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for instance in snapshot['rows']():
+        pass
+    results['snapshot_all_s'] = results['snapshot_first_s'] + time.perf_counter() - start
+    snapshot['close']()
+
+    start = time.perf_counter()
+    with open(roster_path, newline='') as file:
+        rows = read_roster(file, TA)
+        next(rows)
+        results['roster_first_s'] = time.perf_counter() - start
+        for instance in rows:
+            pass
+    results['roster_all_s'] = time.perf_counter() - start
+
+    results['snapshot_bytes'] = os.path.getsize(snapshot_path)
+    results['roster_bytes'] = os.path.getsize(roster_path)
+    os.remove(snapshot_path)
+    os.remove(roster_path)
+    for kind in ('snapshot', 'roster'):
+        print(f"{kind:<9} write {results[kind + '_write_s']:7.3f} s   first instance {results[kind + '_first_s'] * 1e3:9.3f} ms"
+              f"   all {results[kind + '_all_s']:7.3f} s   {results[kind + '_bytes']:>12,} bytes")
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_lazy_instances(n=200_000):
+    """
+    Compare materializing a snapshot with lazy instances for a report that reads two fields.
+
+    The report reads 'getLastName' and 'getGrades' of every TA. Time and peak
+    memory are measured in separate passes, so tracing does not distort the timings.
+
+    Args:
+        n (int): Population size.
+
+    Returns:
+        dict: Time to the first result, total time and peak memory for both approaches.
+    """
+    import os
+    import tempfile
+    import tracemalloc
+    print("---------------------------------------------Bench lazy instances--------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    population = TA['new_many']([('shulamit', 'Mor yossef', date, i + 1, 'software_e', 90 + i % 10, i % 5,
+                                  'swe', 20000 + i % 5000, i % 7) for i in range(n)])
+    path = os.path.join(tempfile.mkdtemp(), 'population.snap')
+    write_snapshot(path, population)
+    del population
+
+    def report(kind):
+        snapshot = load_snapshot(path)
+        load = snapshot['row'] if kind == 'full' else snapshot['lazy']
+        start = time.perf_counter()
+        rows = (load(position) for position in range(snapshot['size']()))
+        first = None
+        lines = []
+        for instance in rows:
+            lines.append((instance['get']('getLastName')(), instance['get']('getGrades')()))
+            if first is None:
+                first = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        return snapshot, first, elapsed
+
+    results = {}
+    for kind in ('full', 'lazy'):
+        snapshot, first, elapsed = report(kind)
+        snapshot['close']()
+        tracemalloc.start()
+        snapshot, _, _ = report(kind)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        snapshot['close']()
+        results[kind] = {'first_s': first, 'total_s': elapsed, 'peak_bytes': peak}
+        print(f'{kind:<5} first result {first * 1e3:8.3f} ms   total {elapsed:7.3f} s   peak {peak / 2 ** 20:8.1f} MiB')
+    os.remove(path)
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_diamond_init(n=200_000):
+    """
+    Compare building TAs with cooperative initialization against calling both base initializers directly.
+
+    The direct variant is a TA twin whose '__init__' calls the Student and
+    Faculty initializers with the plain instance, as TA used to, so Person is
+    initialized twice and both seniorities land in the same slot. The
+    cooperative variant saves the second Person '__init__' but pays for
+    tracking the initializers that ran and for swapping the renamed seniority
+    slot in while Faculty's '__init__' runs. The variants take turns, so that
+    neither drift in the speed of the machine nor the order of the runs favours either of them.
+
+    Args:
+        n (int): Number of TAs per variant.
+
+    Returns:
+        dict: Instances per second and field sets per instance for both variants.
+    """
+    print("---------------------------------------------Bench diamond init----------------------------------------------")
+    student_init = Student['get']('__init__')
+    faculty_init = Faculty['get']('__init__')
+
+    def direct_init(self, firstName, lastName, date, id, faculty, grades, s_seniority, teaching, salary, f_seniority):
+        student_init(self, firstName, lastName, date, id, faculty, grades, s_seniority)
+        faculty_init(self, firstName, lastName, date, id, teaching, salary, f_seniority)
+
+    direct = make_class({'__init__': direct_init}, [TA])
+    direct['diamond'] = False  # construct it as before cooperative initialization, without tracking
+    date = Date['new'](15, 12, 1999)
+    rows = [('shulamit', 'Mor yossef', date, i + 1, 'software_e', 100, 3, 'swe', 30000, 4) for i in range(n)]
+    variants = (('cooperative', TA), ('direct', direct))
+    elapsed = {label: float('inf') for label, _ in variants}
+    for turn in range(6):
+        for label, cls in variants[::-1] if turn % 2 else variants:  # the first to run in a round runs slower
+            gc.collect()
+            start = time.perf_counter()
+            cls['new_many'](rows)
+            elapsed[label] = min(elapsed[label], time.perf_counter() - start)
+    results = {}
+    for label, cls in variants:
+        sets = []
+        counter = lambda instance, name, old, new: sets.append(name)
+        cls['watch'](counter)
+        cls['new'](*rows[0])
+        cls['unwatch'](counter)
+        rate = n / elapsed[label]
+        results[label] = {'instances_per_sec': rate, 'sets_per_instance': len(sets)}
+        print(f'{label:<12} {rate:12,.0f} TAs/s   {len(sets)} field sets per TA')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_queries(n=200_000, repeat=3):
+    """
+    Compare a query for swe students with grades over 90 born after 2000 against the equivalent loop.
+
+    The query runs over the plain population, over the instances of an index
+    on 'faculty' built for that population, and over a column store holding
+    the same students.
+
+    Args:
+        n (int): Population size.
+        repeat (int): Runs per variant; the fastest one is reported.
+
+    Returns:
+        dict: Seconds per run and matches found for each variant.
+    """
+    print("---------------------------------------------Bench queries---------------------------------------------------")
+    faculties = ('swe', 'math', 'physics', 'biology', 'law')
+    rows = [('shulamit', 'Mor yossef', Date['new'](1 + i % 28, 1 + i % 12, 1990 + i % 20), i + 1,
+             faculties[i % 5], 60 + i % 41, 1 + i % 4) for i in range(n)]
+    population = Student['new_many'](rows)
+    store = make_column_store(Student)
+    store['new_many'](rows)
+
+    def naive():
+        return [student for student in population
+                if student['get']('getFaculty')() == 'swe' and student['get']('getGrades')() > 90
+                and student['get']('getDate')()[-4:] > '2000']
+
+    def query(source, cls=None):
+        return make_query(source, cls)['where']('faculty', '==', 'swe')['where']('grades', '>', 90)['where']('date.year', '>', 2000)['rows']()
+
+    variants = [('naive loop', naive), ('query scan', lambda: list(query(population, Student)))]
+    results = {}
+    timings = []
+    for label, run in variants + [('query index', lambda: list(query(None, Student))),
+                                  ('query columns', lambda: list(query(store)))]:
+        if label == 'query index':
+            index = make_index(Student, 'faculty', instances=population)
+        elapsed = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            matches = len(run())
+            elapsed = min(elapsed, time.perf_counter() - start)
+        results[label] = {'seconds': elapsed, 'matches': matches}
+        timings.append(elapsed)
+        print(f'{label:<14} {elapsed * 1e3:9.1f} ms   {matches:,} matches   {timings[0] / elapsed:5.1f}x')
+    index['drop']()
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_import(runs=5):
+    """
+    Measure the time and memory it takes to load this module, and to build every class afterwards.
+
+    Each run imports the module with importlib in a fresh interpreter, from
+    its cached bytecode as a regular import would (and the diamond modules it
+    imports from theirs), so the time is that of executing the modules rather
+    than compiling them. Classes are registered but
+    not built at that point; the run then builds every registered class. Time
+    is measured in one run and memory, which tracemalloc slows down, in another.
+
+    Args:
+        runs (int): Fresh interpreters to start; the fastest run is reported.
+
+    Returns:
+        dict: Seconds and traced bytes for the load and for building all classes, and the number of classes.
+    """
+    import compileall
+    import json
+    import os
+    import py_compile
+    import subprocess
+    print("---------------------------------------------Bench import----------------------------------------------------")
+    code = (
+        'import importlib.util, json, sys, time, tracemalloc\n'
+        'if sys.argv[2] == "trace": tracemalloc.start()\n'
+        'spec = importlib.util.spec_from_file_location("bench_import", sys.argv[1])\n'
+        'module = importlib.util.module_from_spec(spec)\n'
+        'start = time.perf_counter()\n'
+        'spec.loader.exec_module(module)\n'
+        'load_s, load_bytes = time.perf_counter() - start, tracemalloc.get_traced_memory()[0]\n'
+        'core = sys.modules["diamond.core"]\n'
+        'built = len(core.CLASSES)\n'
+        'start = time.perf_counter()\n'
+        'for cls in list(core.REGISTRY.values()): cls["get"]\n'
+        'build_s, build_bytes = time.perf_counter() - start, tracemalloc.get_traced_memory()[0] - load_bytes\n'
+        'print(json.dumps({"load_s": load_s, "load_bytes": load_bytes, "built_at_load": built, "build_all_s": build_s,\n'
+        '                  "build_all_bytes": build_bytes, "classes": len(core.REGISTRY)}))\n')
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def run(mode):
+        output = subprocess.run([sys.executable, '-c', code, __file__, mode], capture_output=True, text=True, check=True,
+                                cwd=here).stdout
+        return json.loads(output)
+
+    # Write the cached bytecode even where PYTHONDONTWRITEBYTECODE is set.
+    py_compile.compile(__file__)
+    compileall.compile_dir(os.path.join(here, 'diamond'), quiet=1)
+    best = None
+    for _ in range(runs):
+        result = run('time')
+        if best is None or result['load_s'] < best['load_s']:
+            best = result
+    traced = run('trace')
+    best.update(load_bytes=traced['load_bytes'], build_all_bytes=traced['build_all_bytes'])
+    print(f"load       {best['load_s'] * 1e3:8.1f} ms {best['load_bytes'] / 1024:9.1f} KiB   {best['built_at_load']} classes built")
+    print(f"build all  {best['build_all_s'] * 1e3:8.1f} ms {best['build_all_bytes'] / 1024:9.1f} KiB   {best['classes']} classes")
+    print("-------------------------------------------------------------------------------------------------------------")
+    return best
+
+
+def bench_batch_updates(n=200_000):
+    """
+    Compare a nightly update of grades, salary and seniority through the setters with one batch.
+
+    Half the population are Students (grades and seniority) and half Faculty
+    (salary and seniority).
+
+    Args:
+        n (int): Population size.
+
+    Returns:
+        dict: Changes per second for the setter loop and for the batch.
+    """
+    print("---------------------------------------------Bench batch updates---------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    students = Student['new_many']([('shulamit', 'Mor yossef', date, i + 1, 'swe', 80, 1) for i in range(n // 2)])
+    faculty = Faculty['new_many']([('shulamit', 'Mor yossef', date, i + 1, 'swe', 20000, 1) for i in range(n // 2)])
+    grades = [60 + i % 41 for i in range(n // 2)]
+    salaries = [20000 + i % 5000 for i in range(n // 2)]
+    changes = 2 * len(students) + 2 * len(faculty)
+
+    start = time.perf_counter()
+    for student, grade in zip(students, grades):
+        student['get']('setGrades')(grade)
+        student['get']('setSeniority')(2)
+    for member, salary in zip(faculty, salaries):
+        member['get']('setSalary')(salary)
+        member['get']('setSeniority')(2)
+    setters = changes / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch = make_batch()
+    batch['update_many'](students, 'grades', grades)
+    batch['update_many'](students, 'seniority', 3)
+    batch['update_many'](faculty, 'salary', salaries)
+    batch['update_many'](faculty, 'seniority', 3)
+    batch['commit']()
+    batched = changes / (time.perf_counter() - start)
+    print(f'setters {setters:14,.0f} changes/s')
+    print(f'batch   {batched:14,.0f} changes/s')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return {'setters': {'changes_per_sec': setters}, 'batch': {'changes_per_sec': batched}}
+
+
+def bench_compiled(n=1_000_000):
+    """
+    Compare field access, method calls and construction on TA and its compiled type.
+
+    The compiled type is measured both through the dispatch protocol
+    (instance['get']('getFirstName')()) and natively (instance.getFirstName()
+    and instance.firstName).
+
+    Args:
+        n (int): Calls per measurement; a tenth of that for construction.
+
+    Returns:
+        dict: Nanoseconds per call for each operation and path.
+    """
+    print("---------------------------------------------Bench compiled classes------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    args = ('shulamit', 'Mor yossef', date, 206576977, 'software_e', 100, 2, 'swe', 30000, 5)
+    native = compile_class(TA)
+    original, compiled = TA['new'](*args), native(*args)
+    cases = [('getter', 'dispatch', lambda: original['get']('getFirstName')()),
+             ('getter', 'compiled protocol', lambda: compiled['get']('getFirstName')()),
+             ('getter', 'compiled native', lambda: compiled.getFirstName()),
+             ('field', 'dispatch', lambda: original['get']('firstName')),
+             ('field', 'compiled native', lambda: compiled.firstName),
+             ('setter', 'dispatch', lambda: original['get']('setGrades')(90)),
+             ('setter', 'compiled native', lambda: compiled.setGrades(90)),
+             ('repr', 'dispatch', lambda: original['get']('repr')()),
+             ('repr', 'compiled native', lambda: compiled.repr()),
+             ('new', 'dispatch', lambda: TA['new'](*args)),
+             ('new', 'compiled native', lambda: native(*args))]
+    results = {}
+    for operation, path, call in cases:
+        calls = n // 10 if operation in ('repr', 'new') else n
+        ns = 1e9 / best_rate(call, calls)
+        results[f'{operation}.{path}'] = {'ns_per_call': ns}
+        print(f'{operation:<7} {path:<18} {ns:10,.1f} ns/call')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_gc_churn(n=100_000, rounds=20):
+    """
+    Measure cyclic garbage collection under a churn workload, for regular and acyclic Students.
+
+    Each round builds n Students one at a time, keeps them while reading a
+    field of each, and drops them. Collections are timed through gc.callbacks.
+
+    Args:
+        n (int): Students per round.
+        rounds (int): Rounds per representation.
+
+    Returns:
+        dict: Seconds per round, collections per generation, and total and longest pause.
+    """
+    print("---------------------------------------------Bench GC churn--------------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    args = ('shulamit', 'Mor yossef', date, 206576977, 'swe', 100, 3)
+    acyclic = make_class({}, [Student], acyclic=True)
+    results = {}
+    for label, cls in (('regular', Student), ('acyclic', acyclic)):
+        pauses = []
+        counts = [0, 0, 0]
+        started = [0.0]
+
+        def timer(phase, info):
+            if phase == 'start':
+                started[0] = time.perf_counter()
+            else:
+                pauses.append(time.perf_counter() - started[0])
+                counts[info['generation']] += 1
+
+        gc.collect()
+        gc.callbacks.append(timer)
+        start = time.perf_counter()
+        try:
+            for _ in range(rounds):
+                population = [cls['new'](*args) for _ in range(n)]
+                for student in population:
+                    student['get']('getGrades')()
+                del population
+        finally:
+            gc.callbacks.remove(timer)
+        elapsed = (time.perf_counter() - start) / rounds
+        results[label] = {'seconds_per_round': elapsed, 'collections': counts,
+                          'pause_total_s': sum(pauses), 'pause_max_s': max(pauses, default=0.0)}
+        print(f'{label:<8} {elapsed:7.3f} s/round   collections gen0/1/2 {counts[0]:>5}/{counts[1]:>4}/{counts[2]:>3}'
+              f'   pauses total {sum(pauses):7.3f} s   max {max(pauses, default=0.0) * 1e3:8.2f} ms')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_dates(n=500_000, repeat=3):
+    """
+    Compare per-object date handling with ordinal keys and batch operations over integer arrays.
+
+    Sorting by birth date is timed with a key built from three 'getX' calls per
+    date, with a 'getOrdinal' key, and with sort_by_date. Counting who is older
+    than 21 is timed with a per-object loop and with date_ordinals plus ages.
+
+    Args:
+        n (int): Number of Students.
+        repeat (int): Runs per variant; the fastest one is reported.
+
+    Returns:
+        dict: Seconds for each variant.
+    """
+    print("---------------------------------------------Bench dates-----------------------------------------------------")
+    students = Student['new_many']([('shulamit', 'Mor yossef', Date['new'](1 + i * 7 % 30, 1 + i * 5 % 12, 1950 + i * 3 % 70),
+                                     i + 1, 'swe', 90, 1) for i in range(n)])
+    today = Date['new'](15, 6, 2024)
+    cutoff = today['get']('getOrdinal')() - 21 * 10000
+
+    def parts_key(student):
+        date = student['get']('date')
+        return date['get']('getYear')(), date['get']('getMonth')(), date['get']('getDay')()
+
+    def older_loop():
+        count = 0
+        for student in students:
+            date = student['get']('date')
+            year, month, day = date['get']('getYear')(), date['get']('getMonth')(), date['get']('getDay')()
+            if (year, month, day) <= (2003, 6, 15):
+                count += 1
+        return count
+
+    def older_batch():
+        return sum(1 for age in ages(date_ordinals(students, 'date'), today) if age >= 21)
+
+    cases = [('sort', 'three getters', lambda: sorted(students, key=parts_key)),
+             ('sort', 'ordinal key', lambda: sorted(students, key=lambda student: student['get']('date')['get']('getOrdinal')())),
+             ('sort', 'sort_by_date', lambda: sort_by_date(students)),
+             ('older than 21', 'per-object loop', older_loop),
+             ('older than 21', 'ordinals + ages', older_batch)]
+    results = {}
+    for job, label, run in cases:
+        elapsed = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            run()
+            elapsed = min(elapsed, time.perf_counter() - start)
+        results[f'{job}.{label}'] = {'seconds': elapsed}
+        print(f'{job:<14} {label:<16} {elapsed:8.3f} s')
+    assert older_loop() == older_batch() == sum(1 for student in students if student['get']('date')['get']('getOrdinal')() <= cutoff)
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_clone(n=100_000, repeat=3):
+    """
+    Compare forking a population with 'new' and with 'clone', in time and memory.
+
+    Each Faculty and TA is forked into a what-if variant with a new salary,
+    either by calling 'new' again with every constructor argument, which runs
+    '__init__' through the whole inheritance chain, or by cloning it. Both
+    variants share the original MyDate, so the memory is that of the forks
+    themselves. The cyclic garbage collector is paused while forking, as
+    'new_many' does, so the timings do not include its scans of the growing
+    population.
+
+    Args:
+        n (int): Number of instances to fork per class.
+        repeat (int): Runs per variant; the fastest one is reported.
+
+    Returns:
+        dict: Forks per second and bytes per fork for each class and variant.
+    """
+    import tracemalloc
+    print("---------------------------------------------Bench clone-----------------------------------------------------")
+    date = Date['new'](15, 12, 1999)
+    populations = {
+        'Faculty': (Faculty, [('Hodaya', 'Shirazie', date, i + 1, 'java', 12000 + i % 1000, 4) for i in range(n)]),
+        'TA': (TA, [('shulamit', 'Mor yossef', date, i + 1, 'swe', 90, 3, 'python', 15000 + i % 1000, 2) for i in range(n)]),
+    }
+    results = {}
+    for name, (cls, rows) in populations.items():
+        originals = cls['new_many'](rows)
+        variants = [('new', lambda: [cls['new'](*args[:-2], args[-2] + 500, args[-1]) for args in rows]),
+                    ('clone', lambda: [cls['clone'](instance, salary=instance['get']('salary') + 500) for instance in originals])]
+        for label, fork in variants:
+            elapsed = float('inf')
+            for _ in range(repeat):
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                forks = fork()
+                elapsed = min(elapsed, time.perf_counter() - start)
+                gc.enable()
+                del forks
+            gc.collect()
+            tracemalloc.start()
+            forks = fork()
+            per_fork = tracemalloc.get_traced_memory()[0] / n
+            tracemalloc.stop()
+            assert forks[0]['get']('getSalary')() == originals[0]['get']('getSalary')() + 500
+            assert forks[0]['get']('date') is date
+            del forks
+            results[f'{name}.{label}'] = {'forks_per_sec': n / elapsed, 'bytes_per_fork': per_fork}
+            print(f'{name:8} {label:6} {n / elapsed:12,.0f} forks/s {per_fork:10,.1f} bytes/fork')
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def bench_async_ingest(n=100_000, batch_size=1024):
+    """
+    Measure roster ingestion from a local socket: throughput, time to first instance and event loop stalls.
+
+    A server on 127.0.0.1 streams a CSV roster of n TAs. The client either
+    reads the whole roster and then builds it with read_roster, which holds
+    the event loop for the entire build, or runs ingest_roster with batches
+    built inline or in a one-thread executor. A ticker task that sleeps 1 ms
+    at a time records the longest the event loop went without running it.
+
+    Args:
+        n (int): Number of TA records to stream.
+        batch_size (int): Batch size for ingest_roster.
+
+    Returns:
+        dict: Records per second, seconds to the first instance and the longest loop stall for each path.
+    """
+    import asyncio
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+    print("---------------------------------------------Bench async ingestion-------------------------------------------")
+    file = io.StringIO()
+    write_roster(file, TA, [TA['new']('shulamit', 'Mor yossef', Date['new'](15, 12, 1999), i + 1, 'swe', 90, 3,
+                                      'python', 15000, 2) for i in range(n)], 'csv')
+    data = file.getvalue().encode()
+
+    async def serve(reader, writer):
+        for start in range(0, len(data), 1 << 16):
+            writer.write(data[start:start + (1 << 16)])
+            await writer.drain()
+        writer.close()
+
+    async def run(mode, executor=None):
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        stall = [0.0]
+
+        async def tick():
+            while True:
+                before = time.perf_counter()
+                await asyncio.sleep(0.001)
+                stall[0] = max(stall[0], time.perf_counter() - before - 0.001)
+
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        first, count = None, 0
+        if mode == 'read_roster':
+            text = (await reader.read()).decode()
+            for _ in read_roster(io.StringIO(text), TA, batch_size=batch_size):
+                first = time.perf_counter() - start if first is None else first
+                count += 1
+        else:
+            async for _ in ingest_roster(reader, TA, batch_size=batch_size, executor=executor):
+                first = time.perf_counter() - start if first is None else first
+                count += 1
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.01)  # let the ticker observe a stall that lasted until the end
+        writer.close()
+        ticker.cancel()
+        server.close()
+        await server.wait_closed()
+        assert count == n
+        return {'records_per_sec': n / elapsed, 'first_instance_seconds': first, 'max_stall_seconds': stall[0]}
+
+    results = {}
+    with ThreadPoolExecutor(1) as executor:
+        for mode, label in (('read_roster', 'read_roster'), ('inline', 'ingest inline'), ('executor', 'ingest executor')):
+            gc.collect()
+            results[mode] = result = asyncio.run(run(mode, executor if mode == 'executor' else None))
+            print(f"{label:<16} {result['records_per_sec']:10,.0f} records/s  first after {result['first_instance_seconds'] * 1000:8.1f} ms"
+                  f"  longest loop stall {result['max_stall_seconds'] * 1000:8.1f} ms")
+    print("-------------------------------------------------------------------------------------------------------------")
+    return results
+
+
+def run_benchmarks(path=None, scale=1.0):
+    """
+    Run the whole benchmark suite and optionally save the results as JSON.
+
+    Every benchmark is called with its default size multiplied by 'scale'. The
+    JSON file records the Python build next to the results so runs can be
+    compared with compare_benchmarks.
+
+    Args:
+        path (str, optional): Where to write the JSON results.
+        scale (float): Multiplier for the size of every benchmark.
+
+    Returns:
+        dict: The metadata and the results of every benchmark, keyed by benchmark name.
+    """
+    import json
+    import platform
+    benchmarks = (bench_construction, bench_attribute_access, bench_bound_methods, bench_accessors,
+                  bench_rendering, bench_instance_memory, bench_new_many, bench_hierarchy, bench_frozen_dates,
+                  bench_concurrent_reads, bench_parallel, bench_snapshot,
+                  bench_lazy_instances, bench_diamond_init, bench_queries,
+                  bench_import, bench_batch_updates,
+                  bench_compiled, bench_gc_churn,
+                  bench_dates, bench_clone, bench_async_ingest)
+    report = {'meta': {'python': sys.version, 'implementation': platform.python_implementation(),
+                       'platform': platform.platform(), 'gil': getattr(sys, '_is_gil_enabled', lambda: True)(),
+                       'timestamp': time.time(), 'scale': scale},
+              'results': {}}
+    for bench in benchmarks:
+        n = max(1, int(bench.__defaults__[0] * scale))
+        report['results'][bench.__name__] = bench(n)
+    if path is not None:
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=2)
+    return report
+
+def compare_benchmarks(old_path, new_path, tolerance=0.1):
+    """
+    Print the metrics that got worse by more than 'tolerance' between two run_benchmarks files.
+
+    Rates ('..._per_sec') are better when higher; latencies, times and sizes are better when lower.
+
+    Args:
+        old_path (str): The baseline results.
+        new_path (str): The results to check.
+        tolerance (float): Allowed relative change before a metric counts as a regression.
+
+    Returns:
+        list: (metric, old value, new value) for every regression.
+    """
+    import json
+
+    def flatten(results, prefix=''):
+        for key, value in results.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f'{prefix}{key}.')
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f'{prefix}{key}', value
+
+    with open(old_path) as file:
+        old = dict(flatten(json.load(file)['results']))
+    with open(new_path) as file:
+        new = dict(flatten(json.load(file)['results']))
+    regressions = []
+    for metric, before in old.items():
+        after = new.get(metric)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        if metric.endswith('_per_sec'):
+            change = -change
+        if change > tolerance:
+            regressions.append((metric, before, after))
+            print(f'{metric:70} {before:14,.1f} -> {after:14,.1f}')
+    return regressions
+
+
 if __name__ == '__main__':
-    test_MyDate()
-    test_Person()
-    test_Student()
-    test_Faculty()
-    test_TA()
+    if sys.argv[1:2] == ['bench']:
+        # python "Dimond inheritance.py" bench [results.json]
+        run_benchmarks(sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        test_MyDate()
+        test_Person()
+        test_Student()
+        test_Faculty()
+        test_TA()
+        test_ColumnStore()
+        test_Roster()
+        test_RenderCache()
+        test_Index()
+        test_Profiling()
+        test_FrozenDate()
+        test_Concurrency()
+        test_Parallel()
+        test_Snapshot()
+        test_LazyInstance()
+        test_Diamond()
+        test_Query()
+        test_LazyClasses()
+        test_Batch()
+        test_Compiled()
+        test_Acyclic()
+        test_DateOrdinals()
+        test_Clone()
+        test_AsyncIngest()
@@ -0,0 +1,21 @@
+"""
+Classes built from dispatch dictionaries, and the subsystems that work on their instances.
+
+The package imports nothing eagerly; import the module you need:
+
+    core           classes, fields, instances and the class registry
+    columns        columnar storage for many instances of one class
+    roster         CSV and JSON Lines roster I/O
+    render         cached rendering of instances
+    indexes        secondary indexes on a field
+    profiling      lookup profiling
+    serialization  instances to and from plain, picklable data
+    parallel       process-parallel map, filter and reduce
+    snapshots      binary snapshots loaded lazily from a memory map
+    lazy           instances backed by a row source
+    queries        queries over instances, column stores and snapshots
+    batches        batched, validated updates with undo
+    compiled       classes compiled into native types with __slots__
+    dates          vectorized operations on date ordinals
+    ingest         asynchronous roster ingestion
+"""
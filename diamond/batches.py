@@ -0,0 +1,184 @@
+"""Batched, validated field updates that can be undone."""
+from array import array
+from itertools import repeat
+
+from .core import MISSING, RECORD_SETTERS, optional_numpy, reject_set
+
+def make_batch():
+    """
+    Create a batch of field changes that is validated and applied as a unit.
+
+    Changes are queued with 'update' and 'update_many' and applied by 'commit'.
+    Before anything is written, the values for each (class, field) pair are
+    validated together with the validator of the field spec: each distinct
+    value is checked once, and with numpy a validator that works on arrays
+    (such as lambda id: id > 0) checks them all in one call. If any value is
+    invalid, 'commit' raises ValueError and nothing is written; this differs
+    from the 'setX' accessors, which silently ignore invalid values.
+
+    Fields are written straight into the record of instances whose class has
+    no hooks and whose 'set' is still their own, and through the instance 'set'
+    otherwise, so indexes and render caches stay current. A field with a
+    handwritten 'setX' in a class that derives fields from others (such as the
+    year of a date, which also updates its ordinal) is written through that
+    method. Instances of frozen classes cannot be updated: 'commit' raises
+    AttributeError, like their 'set'. If a write raises (in a hook, say), that
+    write and every change applied before it are undone. The change log
+    returned by 'commit' holds one (instance, field, old, new) tuple per
+    change, the arguments of a 'watch' hook, so a consumer that does not watch
+    the class can replay it; the old value of a field that was never set is
+    None.
+
+    Returns:
+        dict: A dispatch dictionary with 'update', 'update_many', 'commit',
+        'rollback', 'pending' and 'log'.
+    """
+    changes = []  # (instance, field, value) not yet committed
+    log = []  # (instance, field, old, new) of the committed changes
+
+    def update(instance, field, value):
+        """Queue one field change."""
+        changes.append((instance, field, value))
+
+    def update_many(instances, field, values):
+        """Queue a change of one field on many instances, to a value per instance or to one shared value."""
+        numpy = optional_numpy()
+        if isinstance(values, (list, tuple, array)) or (numpy is not None and isinstance(values, numpy.ndarray)):
+            changes.extend(zip(instances, repeat(field), values))
+        else:
+            changes.extend((instance, field, values) for instance in instances)
+
+    def validate():
+        groups = {}  # (id(cls), field) -> (cls, field, values)
+        for instance, field, value in changes:
+            cls = instance['class']
+            if cls['frozen']:
+                reject_set(field, value)
+            key = (id(cls), field)
+            if key not in groups:
+                groups[key] = (cls, field, [])
+            groups[key][2].append(value)
+        for cls, field, values in groups.values():
+            spec = field_spec(cls, field)
+            if spec is not None and spec['validator'] is not None:
+                invalid = invalid_values(spec['validator'], values)
+                if invalid:
+                    raise ValueError(f"Invalid value for {cls['name']}.{field}: {invalid[0]!r}")
+
+    def commit():
+        """Validate and apply the queued changes as a unit, and return their change log."""
+        validate()
+        applied = []
+        try:
+            for instance, field, value in changes:
+                write_field(instance, field, value, applied)
+        except BaseException:
+            undo(applied)
+            raise
+        changes.clear()
+        log.extend(applied)
+        return public_log(applied)
+
+    def rollback():
+        """Drop the queued changes, or undo the committed ones if nothing is queued."""
+        if changes:
+            changes.clear()
+        else:
+            undo(log)
+            log.clear()
+
+    return {'update': update, 'update_many': update_many, 'commit': commit, 'rollback': rollback,
+            'pending': lambda: len(changes), 'log': lambda: public_log(log)}
+
+def public_log(changes):
+    """Return a copy of a change log with None for the old values of fields that were never set."""
+    if not any(change[2] is MISSING for change in changes):
+        return list(changes)
+    return [(instance, field, None if old is MISSING else old, new) for instance, field, old, new in changes]
+
+def field_spec(cls, field):
+    """Return the make_field spec behind a layout slot of a class, including renamed slots such as 'Faculty.seniority'."""
+    owner_name, _, name = field.rpartition('.')
+    for klass in cls['mro']():
+        if owner_name and klass['name'] != owner_name:
+            continue
+        for spec in klass['fields']():
+            if spec['name'] == name:
+                return spec
+    return None
+
+def invalid_values(validator, values):
+    """
+    Return the values a validator rejects, checking each distinct value once.
+
+    With numpy, numeric values are first offered to the validator as one array;
+    validators that cannot handle arrays fall back to one call per value.
+    """
+    numpy = optional_numpy()
+    try:
+        values = list(set(values))
+    except TypeError:  # unhashable values are checked one by one
+        pass
+    if numpy is not None and len(values) > 64 and all(isinstance(value, (int, float)) for value in values):
+        column = numpy.array(values)
+        try:
+            valid = validator(column)
+        except (TypeError, ValueError):
+            valid = None
+        if isinstance(valid, numpy.ndarray) and valid.shape == column.shape:
+            return column[~valid.astype(bool)].tolist()
+    return [value for value in values if not validator(value)]
+
+def write_field(instance, field, value, log=None):
+    """
+    Write one field for a batch and return its previous value (MISSING if it was never set).
+
+    The field is written straight into the record when nothing observes the
+    instance, through a handwritten setter when the class derives fields from
+    it (such as the ordinal of a date), and through the instance 'set'
+    otherwise. The change is appended to 'log' before a hook or setter can
+    raise, so undoing the log also reverts a write that failed halfway.
+    """
+    cls = instance['class']
+    layout = cls['layout']
+    index = layout.get(field)
+    if (index is not None and not cls['hooks'][0] and getattr(instance['set'], '__code__', None) in RECORD_SETTERS
+            and len(cls['key_fields']) == len(layout)):  # no hooks, wrappers or derived fields to keep current
+        record = instance['storage']
+        old = record[index]
+        record[index] = value
+        if record[-2] is not None and field in record[-2]:
+            del record[-2][field]
+        if log is not None:
+            log.append((instance, field, old, value))
+        return old
+    if 'storage' not in instance:  # a lazy or compiled instance
+        old = instance['get'](field) if index is not None else MISSING
+    elif index is not None:
+        old = instance['storage'][index]
+    else:
+        storage = instance['storage']
+        overflow = storage[-3] if layout else storage
+        old = MISSING if overflow is None else overflow.get(field, MISSING)
+    if log is not None:
+        log.append((instance, field, old, value))
+    if index is not None and len(cls['key_fields']) < len(layout):
+        name = field.rpartition('.')[2]
+        setter = cls['get'](f'set{name[0].upper()}{name[1:]}')
+        if setter is not None and not hasattr(setter, 'accessor'):  # a handwritten setter, such as a date part's
+            setter(instance, value)
+            return old
+    instance['set'](field, value)
+    return old
+
+def undo(changes):
+    """Restore the old values of a change log, newest first."""
+    for instance, field, old, new in reversed(changes):
+        if old is MISSING:
+            write_field(instance, field, None)
+            storage = instance.get('storage')
+            index = instance['class']['layout'].get(field)
+            if storage is not None and index is not None:
+                storage[index] = MISSING
+        else:
+            write_field(instance, field, old)
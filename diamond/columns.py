@@ -0,0 +1,283 @@
+"""Columnar (struct-of-arrays) storage for many instances of one class."""
+from array import array
+import gc
+
+from . import core
+from .core import get_class, optional_numpy, run_init
+from .lazy import make_lazy_instance
+
+COLUMN_TYPES = {'id': 'q', 'grades': 'q', 'salary': 'q', 'seniority': 'q', 'date': 'date',
+                'day': 'q', 'month': 'q', 'year': 'q'}
+DATE_PARTS = ('day', 'month', 'year')
+
+def make_column_store(cls, types=None):
+    """
+    Create a columnar (struct-of-arrays) store for many instances of one class.
+
+    Every declared field of the class gets its own column. Numeric fields are kept
+    in typed arrays, date fields are split into 'field.day', 'field.month' and
+    'field.year' integer columns, and any other field is kept in a plain list.
+    Integer columns read back the ints written to them; the first float written
+    to one, such as an average grade of 92.5, widens the whole column to floats.
+    Rows are exposed as views that speak the same 'get'/'set' protocol as instances,
+    and so are the dates of a row, whose 'set' writes straight into the date columns.
+    'filter', 'filter_columns' and 'aggregate' work directly on the columns without
+    building a view per row. The store is also a row source ('field'/'write') for
+    lazy instances.
+
+    Args:
+        cls (dict): The dispatch dictionary of the class whose instances are stored.
+        types (dict, optional): Maps field names to an array typecode or 'date'. Defaults to COLUMN_TYPES.
+
+    Returns:
+        dict: A dispatch dictionary representing the store.
+    """
+    types = COLUMN_TYPES if types is None else types
+    columns = {}
+    date_fields = set()
+    for field in cls['layout']:
+        kind = types.get(field, types.get(field.rpartition('.')[2]))  # 'Faculty.seniority' is typed as 'seniority'
+        if kind == 'date':
+            date_fields.add(field)
+            for part in DATE_PARTS:
+                columns[f'{field}.{part}'] = array('q')
+        elif kind is not None:
+            columns[field] = array(kind)
+        else:
+            columns[field] = []
+    extras = {}  # row index -> dict of undeclared names set on that row
+    size = [0]
+
+    def append_row():
+        """Append a row of empty values and return its index."""
+        for column in columns.values():
+            column.append(0 if isinstance(column, array) else None)
+        size[0] += 1
+        return size[0] - 1
+
+    def date_view(index, field):
+        """Return a view of the date in one row that reads and writes the date columns."""
+        parts = {part: columns[f'{field}.{part}'] for part in DATE_PARTS}
+        date_class = get_class('MyDate')
+
+        def get_value(name):
+            column = parts.get(name)
+            if column is not None:
+                return column[index]
+            if name in date_class['layout']:  # derived fields, such as the ordinal, are recomputed from the parts
+                return None
+            return core.bind_method(date_class['get'](name), view)
+
+        def set_value(name, value):
+            column = parts.get(name)
+            if column is not None:
+                column[index] = value
+            elif name not in date_class['layout']:
+                raise AttributeError(f"Cannot set '{name}' on the date of a column store row")
+
+        view = {'get': get_value, 'set': set_value, 'class': date_class,
+                'materialize': lambda: date_class['new'](*[parts[part][index] for part in DATE_PARTS])}
+        return view
+
+    def row(index):
+        """Return a view of one row that behaves like an instance of the class."""
+
+        def get_value(name):
+            """Retrieve a field from its column, or an attribute or method, checking the class if necessary."""
+            column = columns.get(name)
+            if column is not None:
+                return column[index]
+            if name in date_fields:
+                return date_view(index, name)
+            if index in extras and name in extras[index]:
+                return extras[index][name]
+            return core.bind_method(cls['get'](name), view)
+
+        def set_value(name, value):
+            """Set a field in its column, or any other name on the row."""
+            column = columns.get(name)
+            if column is not None:
+                try:
+                    column[index] = value
+                except TypeError:
+                    if not isinstance(value, float) or not isinstance(column, array) or column.typecode == 'd':
+                        raise
+                    column = columns[name] = array('d', column)
+                    column[index] = value
+            elif name in date_fields:
+                for part in DATE_PARTS:
+                    columns[f'{name}.{part}'][index] = value['get'](part)
+            else:
+                extras.setdefault(index, {})[name] = value
+
+        view = {'get': get_value, 'set': set_value, 'class': cls,
+                'materialize': lambda: make_lazy_instance(cls, store, index)['materialize']()}
+        return view
+
+    def new(*args):
+        """Append a row initialized by the class '__init__' and return its view."""
+        view = row(append_row())
+        init = cls['get']('__init__')
+        if init:
+            run_init(view, init, args)
+        return view
+
+    def new_many(rows):
+        """
+        Append one row per tuple of constructor arguments and return their views.
+
+        Every column is grown once for the whole batch, and the cyclic garbage
+        collector is paused while the rows are initialized, as in the class 'new_many'.
+        """
+        if not hasattr(rows, '__len__'):
+            rows = list(rows)
+        start = size[0]
+        count = len(rows)
+        for column in columns.values():
+            column.extend(array(column.typecode, [0]) * count if isinstance(column, array) else [None] * count)
+        size[0] += count
+        init = cls['get']('__init__')
+        views = [None] * count
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for i, args in enumerate(rows):
+                view = views[i] = row(start + i)
+                if init:
+                    run_init(view, init, args)
+        finally:
+            if collecting:
+                gc.enable()
+        return views
+
+    def append(instance):
+        """Copy the declared fields of an existing instance into a new row and return its view."""
+        view = row(append_row())
+        for field in cls['layout']:
+            value = instance['get'](field)
+            if value is not None and not callable(value):
+                view['set'](field, value)
+        return view
+
+    def read_field(index, name):
+        """Return one field of a row, or None if the store has no column for it. The row source 'field' entry."""
+        column = columns.get(name)
+        if column is not None:
+            return column[index]
+        if name in date_fields:
+            return date_view(index, name)
+        return None
+
+    def column_values(name, rows):
+        """Return a column, or only the given rows of it."""
+        column = columns[name]
+        if rows is None:
+            return column
+        return [column[i] for i in rows]
+
+    def filter_rows(conditions, rows=None):
+        """
+        Return the indices of the rows whose columns satisfy every predicate.
+
+        Args:
+            conditions (dict): Maps a column name to a predicate over one value.
+            rows (list, optional): Only consider these row indices.
+
+        Returns:
+            list: Matching row indices, in ascending order.
+        """
+        selected = range(size[0]) if rows is None else list(rows)
+        for name, predicate in conditions.items():
+            column = columns[name]
+            selected = [i for i in selected if predicate(column[i])]
+        return list(selected)
+
+    def filter_columns(conditions, rows=None):
+        """
+        Like 'filter', but with numpy available, predicates on typed columns receive the whole column as an array.
+
+        The predicates must therefore accept both one value and a numpy array, as
+        comparisons such as lambda grades: grades > 85 do; without numpy they are
+        called once per value.
+
+        Args:
+            conditions (dict): Maps a column name to a predicate over one value or a whole column.
+            rows (list, optional): Only consider these row indices.
+
+        Returns:
+            list: Matching row indices, in ascending order.
+        """
+        numpy = optional_numpy()
+        selected = None if rows is None else list(rows)
+        mask = None
+        per_value = []
+        for name, predicate in conditions.items():
+            column = columns[name]
+            if numpy is not None and isinstance(column, array):
+                hits = predicate(numpy.frombuffer(column, dtype=column.typecode))
+                mask = hits if mask is None else mask & hits
+            else:
+                per_value.append((column, predicate))
+        if mask is not None:
+            selected = numpy.flatnonzero(mask).tolist() if selected is None else [i for i in selected if mask[i]]
+        elif selected is None:
+            selected = range(size[0])
+        for column, predicate in per_value:
+            selected = [i for i in selected if predicate(column[i])]
+        return list(selected)
+
+    def aggregate(name, how='sum', by=None, rows=None):
+        """
+        Aggregate one column, optionally grouped by the values of another.
+
+        Args:
+            name (str): The column to aggregate.
+            how (str): One of 'sum', 'mean', 'min', 'max' or 'count'.
+            by (str, optional): A column whose values define the groups.
+            rows (list, optional): Only aggregate these row indices.
+
+        Returns:
+            The aggregate value, or a dict mapping each group to its aggregate value.
+        """
+        values = column_values(name, rows)
+        if by is None:
+            return reduce_values(values, how)
+        groups = {}
+        for key, value in zip(column_values(by, rows), values):
+            groups.setdefault(key, []).append(value)
+        return {key: reduce_values(group, how) for key, group in groups.items()}
+
+    store = {'new': new, 'new_many': new_many, 'append': append, 'row': row, 'size': lambda: size[0],
+             'column': lambda name: columns[name], 'filter': filter_rows, 'filter_columns': filter_columns, 'aggregate': aggregate,
+             'field': read_field, 'write': lambda index, name, value: row(index)['set'](name, value),
+             'lazy': lambda index: make_lazy_instance(cls, store, index)}
+    return store
+
+def reduce_values(values, how):
+    """
+    Reduce a sequence of column values with one of the aggregate functions of the column store.
+
+    Args:
+        values (sequence): The values to reduce. Typed arrays are reduced by numpy when it is available.
+        how (str): One of 'sum', 'mean', 'min', 'max' or 'count'.
+
+    Returns:
+        The reduced value, or None for 'mean', 'min' and 'max' over no values.
+    """
+    numpy = optional_numpy()
+    if how == 'count':
+        return len(values)
+    if numpy is not None and isinstance(values, array) and len(values):
+        values = numpy.frombuffer(values, dtype=values.typecode)
+        return getattr(values, how)().item()
+    if how == 'sum':
+        return sum(values)
+    if not len(values):
+        return None
+    if how == 'mean':
+        return sum(values) / len(values)
+    if how == 'min':
+        return min(values)
+    if how == 'max':
+        return max(values)
+    raise ValueError(f'Unknown aggregate: {how}')
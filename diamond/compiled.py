@@ -0,0 +1,104 @@
+"""Compilation of classes into native Python types with __slots__."""
+from .core import MISSING, run_init
+
+def compile_class(cls):
+    """
+    Compile a class into a native Python type with '__slots__'.
+
+    The type has one slot per field of the class layout (renamed fields such as
+    'Faculty.seniority' become 'Faculty__seniority'), real methods for the
+    generated accessors (getX returns the slot, setX validates and sets it),
+    and every other name of the class resolution table as a plain class
+    attribute, so the handwritten methods run unchanged. Its instances also
+    speak the dispatch protocol: instance['get'] and instance['set'] are
+    adapters over the slots that run the class hooks, and instance['class'] is
+    the original class. The type itself answers ['new'] and ['new_many'], and
+    passes any other key on to the class, so existing callers keep working
+    while new code can use instance.firstName or instance.getFirstName().
+
+    The type is a snapshot of the class: names set on the class afterwards are
+    not seen by the type. Each compiled type is standalone (not a subclass of
+    the compiled bases), since slotted types cannot share a diamond. Frozen
+    classes cannot be compiled.
+
+    Args:
+        cls (dict): The dispatch dictionary of the class.
+
+    Returns:
+        type: The compiled type, also kept as cls['compiled'].
+    """
+    if cls['frozen']:
+        raise TypeError(f"Frozen class '{cls['name']}' cannot be compiled")
+    if 'compiled' in cls:
+        return cls['compiled']
+    layout = cls['layout']
+    slots = {field: field.replace('.', '__') for field in layout}
+    defaults = [None if value is MISSING else value for value in cls['blank'][:len(layout)]]
+    hooks = cls['hooks']
+    init = cls['get']('__init__')
+    names = {name for klass in cls['mro']() for name in klass['attributes']()}
+
+    def get_value(self, name):
+        """Retrieve a field, an attribute or a bound method; None if there is no such name."""
+        return getattr(self, slots.get(name, name), None)
+
+    def set_value(self, name, value):
+        """Set a field or any other name on the instance, then run the class hooks."""
+        slot = slots.get(name, name)
+        current = hooks[0]
+        if current:
+            old = getattr(self, slot, None)
+            setattr(self, slot, value)
+            for hook in current:
+                hook(self, name, old, value)
+        else:
+            setattr(self, slot, value)
+
+    source = ['def __init__(self, *args):']
+    source += [f'    self.{slot} = defaults[{i}]' for i, slot in enumerate(slots.values())]
+    if init:
+        source.append('    run_init(self, init, args)' if cls['diamond'] else '    init(self, *args)')
+    namespace = {'__slots__': tuple(slots.values()) + (('initialized',) if cls['diamond'] else ()) + ('__dict__',),
+                 '__init__': compile_source(source, {'defaults': defaults, 'init': init, 'run_init': run_init}),
+                 'get': get_value, 'set': set_value, 'class': cls, '__getitem__': object.__getattribute__,
+                 '__setitem__': object.__setattr__, '__delitem__': object.__delattr__,
+                 '__contains__': lambda self, name: hasattr(self, name)}
+    for name in names:
+        value = cls['get'](name)
+        accessor = getattr(value, 'accessor', None)
+        if name == '__init__' or name in slots:
+            continue
+        if accessor is None:
+            namespace[name] = value
+        elif accessor[0] == 'get':
+            namespace[name] = compile_source([f'def {name}(self):', f'    return self.{slots[accessor[1]]}'], {})
+        else:
+            namespace[name] = native_setter(*accessor[1:])
+    if 'str' in namespace:
+        namespace['__str__'] = lambda self: self.str()
+    if 'repr' in namespace:
+        namespace['__repr__'] = lambda self: self.repr()
+
+    def class_item(native, key):
+        if key == 'new':
+            return native
+        if key == 'new_many':
+            return lambda rows: [native(*args) for args in rows]
+        return cls[key]
+
+    namespace['__class_getitem__'] = classmethod(class_item)
+    compiled = cls['compiled'] = type(cls['name'], (), namespace)
+    return compiled
+
+def compile_source(lines, names):
+    """Compile the source of one function and return it, with names as its globals."""
+    scope = dict(names)
+    exec('\n'.join(lines), scope)
+    return scope[lines[0][4:lines[0].index('(')]]
+
+def native_setter(name, validator):
+    def setter(self, value):
+        if validator is None or validator(value):
+            self.set(name, value)
+    setter.__name__ = 'set' + name[0].upper() + name[1:]
+    return setter
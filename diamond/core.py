@@ -0,0 +1,951 @@
+"""Classes and instances as dispatch dictionaries."""
+import gc
+import threading
+import weakref
+
+MISSING = object()  # marks a declared field slot that has not been assigned yet
+NUMPY = []  # the numpy module or None once optional_numpy has looked for it
+CLASSES = []  # every class created by make_class, in creation order
+REGISTRY = {}  # class name -> the named class most recently created under it
+PENDING = {}  # class name -> the empty dict a lazily registered class will be built into, see register_class
+PROFILE = None  # lookup statistics and the wrappers that record them while profiling is enabled, see diamond.profiling
+
+# Concurrency contract
+#
+# Reads never take a lock. A class publishes its resolution table and its hooks
+# as immutable snapshots: every change builds a new table (and a new tuple of
+# hooks) and swaps it in with a single assignment, so a reader sees either the
+# old or the new version, never a half-built one. The published cls['get'] is
+# itself the version token that instance bound-method caches compare against.
+# Writers to classes (set, watch, unwatch, class creation) serialize on
+# CLASS_LOCK so that concurrent rebuilds publish in order. A single instance
+# 'get' or 'set' is one dict or list operation and therefore atomic on both
+# regular and free-threaded CPython; callers that update several fields of one
+# instance together must coordinate those updates themselves. Indexes take
+# their own lock for writes and publish copy-on-write buckets. Column stores,
+# render caches and batches assume one writer at a time.
+CLASS_LOCK = threading.RLock()
+
+def optional_numpy():
+    """Return numpy, or None if it is not installed. It only accelerates columns and batches, and is slow to import."""
+    if not NUMPY:
+        try:
+            import numpy
+        except ImportError:  # plain arrays work without it
+            numpy = None
+        NUMPY.append(numpy)
+    return NUMPY[0]
+
+def make_class(attributes, base_class=None, fields=None, name=None, frozen=False, intern=False, acyclic=False):
+    """
+    Create a new class represented as a dispatch dictionary.
+
+    The class linearizes its bases with C3 (so diamonds such as TA resolve
+    deterministically) and flattens every name visible through that MRO into a
+    single resolution table, so a lookup is one dict probe. The table is rebuilt
+    whenever this class or any class in its MRO calls 'set'.
+
+    Classes that declare their fields (here or in any base) get a fixed layout,
+    and their instances keep those fields in a list indexed by that layout.
+    Every declared field also gets a 'getX'/'setX' accessor pair unless the
+    class defines that name itself (see make_field).
+
+    When unrelated bases declare the same field, as Student and Faculty both
+    declare 'seniority' for TA, the first of them in the MRO keeps the plain
+    name and every other one gets its own slot named 'Base.field'. The class
+    'renames' maps the name of each such base to its renamed fields, and
+    as_base gives the code of that base a view of the instance that uses them.
+
+    Functions registered with 'watch' are called as hook(instance, name, old, new)
+    after every 'set' on an instance of this class or of any subclass.
+
+    'clone' forks an existing instance without running '__init__' (see
+    clone_instance), for variants of a record that differ in a few fields.
+
+    Instances of a frozen class are sealed once '__init__' returns (see
+    freeze_instance). A frozen class may also intern its instances, so that
+    constructing an equal value returns the instance built the first time.
+
+    Instances of an acyclic class do not refer to themselves, at the price of
+    binding methods on every lookup instead of caching them.
+
+    Args:
+        attributes (dict): A dictionary containing the attributes and methods of the class.
+        base_class (list, optional): A list of base classes (dispatch dictionaries) to inherit from.
+        fields (list, optional): The instance fields this class declares, as names or make_field specs.
+        name (str, optional): The class name, used in profiling reports and to find the class again
+            with get_class, for example in worker processes.
+        frozen (bool): Whether instances reject 'set' after '__init__'.
+        intern (bool): Whether equal frozen instances are shared. Requires frozen.
+        acyclic (bool): Whether instances avoid reference cycles, so they are freed by reference
+            counting alone (see make_acyclic_instance).
+
+    Returns:
+        dict: A dispatch dictionary representing the class.
+    """
+    if intern and not frozen:
+        raise ValueError('Only frozen classes can intern their instances')
+    bases = list(base_class) if base_class is not None else []
+    diamond = len(bases) > 1 or any(base['diamond'] for base in bases)  # some '__init__' may be reached twice
+    subclasses = []
+    by_args = {} if intern else None  # constructor arguments -> interned instance
+    by_key = {} if intern else None  # field values -> interned instance
+    watchers = []
+    hooks = [()]  # tuple of the watchers of every class in the MRO; swapped in place so instances can hold on to the cell
+
+    def set_value(name, value):
+        """Set an attribute or method in the class."""
+        with CLASS_LOCK:
+            attributes[name] = value
+            refresh()
+
+    def new(*args):
+        """Create a new instance of the class and initialize it."""
+        if not frozen:
+            return init_instance(cls, *args)
+        if by_args is not None and args in by_args:
+            return by_args[args]
+        instance = freeze_instance(cls, init_instance(cls, *args))
+        if by_args is not None:
+            instance = by_args[args] = by_key.setdefault(instance['key'], instance)
+        return instance
+
+    def new_many(rows, into=None):
+        """
+        Create and initialize one instance per tuple of constructor arguments.
+
+        '__init__' and the instance layout are resolved once for the whole batch
+        and the result list is allocated up front. Every new instance stays
+        reachable from that list, so the cyclic garbage collector is paused while
+        the batch is built instead of repeatedly scanning the growing batch.
+
+        Args:
+            rows (iterable): Tuples of arguments, one per instance.
+            into (dict, optional): A column store of this class to fill instead of building instances.
+
+        Returns:
+            list: The new instances, or the new row views when 'into' is given.
+        """
+        if into is not None:
+            return into['new_many'](rows)
+        if frozen:
+            return [new(*args) for args in rows]
+        if not hasattr(rows, '__len__'):
+            rows = list(rows)
+        init = cls['get']('__init__')
+        layout = cls['layout']
+        tracked = cls['diamond']
+        instances = [None] * len(rows)
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for i, args in enumerate(rows):
+                instance = make_record_instance(cls, layout) if layout and not acyclic else make_instance(cls)
+                if not init:
+                    pass
+                elif tracked:  # as run_init, which need not clean up after a failure: the batch is lost then
+                    instance['initialized'] = {init}
+                    init(instance, *args)
+                    del instance['initialized']
+                else:
+                    init(instance, *args)
+                instances[i] = instance
+        finally:
+            if collecting:
+                gc.enable()
+        return instances
+
+    def clone(instance, **changes):
+        """Copy an instance of this class (or of a subclass), then set the changed fields on the copy."""
+        if not any(klass is cls for klass in instance['class']['mro']()):
+            raise TypeError(f"Cannot clone an instance of '{instance['class']['name']}' as '{cls['name']}'")
+        return clone_instance(instance, changes)
+
+    def watch(hook):
+        """Call hook(instance, name, old, new) after every instance 'set' on this class and its subclasses."""
+        with CLASS_LOCK:
+            watchers.append(hook)
+            refresh()
+
+    def unwatch(hook):
+        """Stop calling a hook registered with 'watch'."""
+        with CLASS_LOCK:
+            watchers.remove(hook)
+            refresh()
+
+    def rebuild():
+        """Rebuild the resolution table and hooks of this class alone."""
+        table = {}
+        for klass in reversed(mro):
+            table.update(klass['attributes']())
+        cls['get'] = table.get if PROFILE is None else PROFILE['wrap_lookup'](cls, table.get)
+        hooks[0] = tuple(hook for klass in mro for hook in klass['watchers']())
+
+    def refresh():
+        """Rebuild this class and every class inheriting from it, each once (see descendants)."""
+        for klass in descendants(cls):
+            klass['rebuild']()
+
+    declared = tuple(make_field(spec) if isinstance(spec, str) else spec for spec in fields or ())
+    for spec in declared:
+        for accessor in make_accessors(spec):
+            attributes.setdefault(accessor.__name__, accessor)
+    cls = PENDING.pop(name, {}) if name is not None else {}  # a lazily registered class is built in place
+    cls.update({'set': set_value, 'new': new, 'new_many': new_many, 'clone': clone, 'rebuild': rebuild, 'refresh': refresh,
+                'fields': lambda: declared, 'mro': lambda: mro, 'attributes': lambda: attributes, 'subclasses': lambda: subclasses,
+                'watch': watch, 'unwatch': unwatch, 'watchers': lambda: watchers, 'hooks': hooks, 'indexes': {},
+                'name': name if name is not None else f'class@{id(attributes):x}', 'frozen': frozen, 'diamond': diamond,
+                'acyclic': acyclic,
+                'intern': (lambda instance: by_key.setdefault(instance['key'], instance)) if intern else None})
+    mro = c3_linearize(cls, bases)
+    owners = {}  # field name -> the first class in the MRO that declares it
+    for klass in mro:
+        for spec in klass['fields']():
+            owners.setdefault(spec['name'], klass)
+
+    def slot(klass, field):
+        """The layout name of a field declared by klass: plain unless klass is unrelated to the main owner."""
+        owner = owners[field]
+        return field if owner is klass or klass in owner['mro']() else f"{klass['name']}.{field}"
+
+    layout = {}
+    blank = []
+    key_fields = []  # the layout slots that make up the 'key' of frozen instances
+    for klass in reversed(mro):
+        for spec in klass['fields']():
+            if slot(klass, spec['name']) not in layout:
+                layout[slot(klass, spec['name'])] = len(layout)
+                blank.append(spec['default'])
+                if not spec.get('derived'):
+                    key_fields.append(slot(klass, spec['name']))
+    renames = {}  # base name -> {field: slot} for the bases whose fields are namespaced here
+    for klass in mro:
+        for field in owners:
+            owner = next((base for base in klass['mro']() if any(spec['name'] == field for spec in base['fields']())), None)
+            if owner is not None and slot(owner, field) != field:
+                renames.setdefault(klass['name'], {})[field] = slot(owner, field)
+    cls['layout'] = layout
+    cls['blank'] = blank + [None, None, None]
+    cls['key_fields'] = tuple(key_fields)
+    cls['renames'] = renames
+    # base name -> (index of the plain field, index of its renamed slot) pairs, for init_base
+    cls['renamed_slots'] = {base: tuple((layout[field], layout[renamed]) for field, renamed in fields.items())
+                            for base, fields in renames.items()}
+    with CLASS_LOCK:
+        for base in bases:
+            base['subclasses']().append(cls)
+        CLASSES.append(cls)
+        if name is not None:
+            REGISTRY[name] = cls
+        refresh()
+    return cls
+
+def descendants(cls):
+    """
+    Return a class and every class inheriting from it, directly or not, each once.
+
+    A diamond is reached through each of its bases, so walking the subclass
+    lists recursively would visit it once per path, which grows exponentially
+    with the depth of stacked diamonds. Every class comes after all of its bases,
+    as the MRO of a subclass is longer than that of any of its bases.
+    """
+    found = {id(cls): cls}
+    pending = [cls]
+    while pending:
+        for sub in pending.pop()['subclasses']():
+            if id(sub) not in found:
+                found[id(sub)] = sub
+                pending.append(sub)
+    return sorted(found.values(), key=lambda klass: len(klass['mro']()))
+
+def make_field(name, validator=None, default=MISSING, derived=False):
+    """
+    Declare an instance field for make_class.
+
+    The class gets a 'getX' accessor for the field and a 'setX' accessor that
+    silently ignores values the validator rejects, like the handwritten setters.
+    On record instances both are bound straight to the field slot instead of
+    going through bind_method and a nested 'get'.
+
+    A derived field caches a value the class computes from its other fields,
+    such as the ordinal of a date. It gets no 'setX' accessor and is left out
+    of the 'key' of frozen instances.
+
+    Args:
+        name (str): The field name.
+        validator (callable, optional): Returns whether a value may be stored by 'setX'.
+        default (any, optional): The initial value of the field in every new instance.
+        derived (bool): Whether the class computes the field from the other fields.
+
+    Returns:
+        dict: The field spec.
+    """
+    return {'name': name, 'validator': validator, 'default': default, 'derived': derived}
+
+def make_accessors(spec):
+    """
+    Generate the 'getX'/'setX' class functions of a field spec.
+
+    Each function carries an 'accessor' attribute, (kind, name, validator), that
+    record instances use to bind a direct-access version of it.
+
+    Args:
+        spec (dict): A field spec from make_field.
+
+    Returns:
+        tuple: The getter and the setter, or only the getter for a derived field.
+    """
+    name = spec['name']
+    validator = spec['validator']
+    suffix = name[0].upper() + name[1:]
+
+    def getter(self):
+        return self['get'](name)
+
+    def setter(self, value):
+        if validator is None or validator(value):
+            self['set'](name, value)
+
+    getter.__name__, getter.__doc__ = 'get' + suffix, f'Returns the {name}.'
+    setter.__name__, setter.__doc__ = 'set' + suffix, f'Sets the {name}' + (' if valid.' if validator else '.')
+    getter.accessor = ('get', name, None)
+    setter.accessor = ('set', name, validator)
+    return (getter,) if spec.get('derived') else (getter, setter)
+
+def register_class(name, factory, *args, **kwargs):
+    """
+    Register a class that is built by factory(*args, **kwargs) the first time it is used.
+
+    The returned class is a dispatch dictionary that stays empty until one of
+    its entries is read; the factory then runs and make_class fills that same
+    dictionary, so references taken before the build (module globals, bases
+    of other classes, the registry) stay valid. The factory must create the
+    class with make_class under the registered name. If the factory raises,
+    the class is left unbuilt and the next use tries again.
+
+    Args:
+        name (str): The class name.
+        factory (callable): A function creating the class, such as Person.
+        *args: Arguments for the factory.
+        **kwargs: Keyword arguments for the factory.
+
+    Returns:
+        dict: The dispatch dictionary the class will be built into.
+    """
+    cls = LazyClass()
+
+    def build():
+        try:
+            return factory(*args, **kwargs)
+        except BaseException:
+            dict.clear(cls)  # undo a partial build, so the class can be built again
+            PENDING[name] = cls
+            raise
+
+    cls.build = build
+    with CLASS_LOCK:
+        PENDING[name] = cls
+        REGISTRY[name] = cls
+    return cls
+
+def build_lazy_class(cls, key):
+    """The '__missing__' of lazily registered classes: build the class, then look the key up again."""
+    with CLASS_LOCK:
+        build = getattr(cls, 'build', None)
+        if build is not None:
+            del cls.build  # reads of the class while it is being built must not build it again
+            try:
+                built = build()
+            except BaseException:
+                cls.build = build
+                raise
+            if built is not cls:
+                raise TypeError('The factory of a lazily registered class must build it with make_class under its name')
+    if key in cls:
+        return dict.__getitem__(cls, key)
+    raise KeyError(key)
+
+# A dict that calls build_lazy_class for missing keys. Like InstanceDict, it subclasses dict only for what a plain dict cannot do.
+LazyClass = type('LazyClass', (dict,), {'__missing__': build_lazy_class, '__slots__': ('build',)})
+
+def define_classes(spec):
+    """
+    Register a hierarchy of lazily built classes from a declarative spec.
+
+    Each entry is a dict with a 'name' and either a 'factory' (with optional
+    'args' and 'kwargs'), or the make_class arguments 'attributes', 'bases'
+    (as class names), 'fields', 'frozen' and 'intern'. Bases are looked up with
+    get_class when the class is built, so the entries may come in any order.
+
+    Args:
+        spec (list): The class entries.
+
+    Returns:
+        dict: Maps each name to its (not yet built) class.
+    """
+    classes = {}
+    for entry in spec:
+        if 'factory' in entry:
+            classes[entry['name']] = register_class(entry['name'], entry['factory'], *entry.get('args', ()), **entry.get('kwargs', {}))
+        else:
+            classes[entry['name']] = register_class(entry['name'], lambda entry=entry: make_class(
+                dict(entry.get('attributes', {})), [get_class(base) for base in entry.get('bases', ())],
+                fields=entry.get('fields'), name=entry['name'], frozen=entry.get('frozen', False),
+                intern=entry.get('intern', False)))
+    return classes
+
+def get_class(name):
+    """
+    Return the class registered under a name.
+
+    Args:
+        name (str): The name given to make_class.
+
+    Returns:
+        dict: The dispatch dictionary representing the class.
+    """
+    if name not in REGISTRY:
+        raise KeyError(f"No class named '{name}' is registered")
+    return REGISTRY[name]
+
+def c3_linearize(cls, bases):
+    """
+    Compute the C3 method resolution order of a class.
+
+    Args:
+        cls (dict): The dispatch dictionary of the class being created.
+        bases (list): Its direct base classes, in declaration order.
+
+    Returns:
+        tuple: The class followed by its ancestors, each appearing exactly once.
+    """
+    sequences = [list(base['mro']()) for base in bases] + [list(bases)]
+    result = [cls]
+    while True:
+        sequences = [seq for seq in sequences if seq]
+        if not sequences:
+            return tuple(result)
+        for seq in sequences:
+            head = seq[0]
+            # Classes are dicts, so membership must be tested by identity rather than equality.
+            if not any(head is klass for other in sequences for klass in other[1:]):
+                break
+        else:
+            raise TypeError('Cannot create a consistent method resolution order (MRO)')
+        result.append(head)
+        for seq in sequences:
+            if seq[0] is head:
+                del seq[0]
+
+def freeze_instance(cls, instance):
+    """
+    Seal an initialized instance of a frozen class.
+
+    The class '__freeze__' method, if any, runs first so it can store derived
+    values. The values of the non-derived fields, followed by the sorted (name,
+    value) pairs of any undeclared attributes other than methods, are stored as
+    a hashable tuple under the instance 'key' entry, so that interning tells
+    apart instances that differ only in undeclared attributes. The 'str' output
+    is then rendered once and kept on the instance, and the instance 'set' is
+    replaced by one that raises AttributeError.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the frozen class.
+        instance (dict): The dispatch dictionary of a freshly initialized instance.
+
+    Returns:
+        dict: The same instance, now frozen.
+    """
+    prepare = instance['get']('__freeze__')
+    if prepare:
+        prepare()
+    key = tuple(instance['get'](field) for field in cls['key_fields'])
+    extra = instance['storage'][-3] if cls['layout'] else instance['storage']
+    if extra:
+        key += tuple(sorted((name, value) for name, value in extra.items() if not callable(value)))
+    render = instance['get']('str')
+    if render:
+        text = render()
+        instance['set']('str', lambda: text)
+    instance['key'] = key
+    instance['set'] = reject_set
+    return instance
+
+def reject_set(name, value):
+    """The 'set' of frozen instances."""
+    raise AttributeError(f"Cannot set '{name}' on a frozen instance")
+
+def init_instance(cls, *args):
+    """
+    Create a new object instance of type cls and initialize it with args.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class.
+        *args: Arguments to pass to the '__init__' method if it exists.
+
+    Returns:
+        dict: A dispatch dictionary representing the instance.
+    """
+    instance = make_instance(cls)
+    init = cls['get']('__init__')
+    if not init:
+        pass
+    elif cls['diamond']:  # as run_init, which need not clean up after a failure: the instance is lost then
+        instance['initialized'] = {init}
+        init(instance, *args)
+        del instance['initialized']
+    else:
+        init(instance, *args)
+    return instance
+
+def clone_instance(instance, changes=None):
+    """
+    Fork an instance: a new instance of the same class with the same field values, without running '__init__'.
+
+    The copy is shallow. Nested values such as the MyDate of a Person are
+    shared by the original and the copy, so replace them (for example with a
+    clone of their own) rather than changing them in place. Record instances
+    copy their field slots with one list slice and start with an empty
+    bound-method cache; when the class has watchers, every field is set
+    through the copy 'set' instead, so hooks and indexes see the new instance.
+    A frozen instance is immutable and is returned as is. Lazy instances and
+    column store rows have no storage to copy; their fields are read through
+    their 'get' into a regular instance (see their 'materialize').
+
+    Args:
+        instance (dict): The dispatch dictionary of the instance to fork.
+        changes (dict, optional): Field values to set on the copy, by layout name.
+
+    Returns:
+        dict: The copy.
+    """
+    if not isinstance(instance, dict):  # a compiled instance, see compile_class
+        copy = object.__new__(type(instance))
+        for slot in type(instance).__slots__[:-1]:
+            if hasattr(instance, slot):
+                object.__setattr__(copy, slot, getattr(instance, slot))
+        copy.__dict__.update((name, value) for name, value in instance.__dict__.items() if name != 'anchor')
+    elif instance['class']['frozen']:
+        if changes:
+            reject_set(next(iter(changes)), None)
+        return instance
+    elif 'storage' not in instance:  # a lazy instance or a column store row
+        copy = instance['materialize']()
+    else:
+        cls = instance['class']
+        copy = make_instance(cls)
+        source, target = instance['storage'], copy['storage']
+        if cls['hooks'][0]:
+            values = source
+            if cls['layout']:
+                values = {name: source[index] for name, index in cls['layout'].items() if source[index] is not MISSING}
+                values.update(source[-3] or {})
+            for name, value in values.items():
+                copy['set'](name, value)
+        elif cls['layout']:
+            target[:-3] = source[:-3]
+            if source[-3]:
+                target[-3] = dict(source[-3])
+        else:
+            target.update(source)
+    for name, value in (changes or {}).items():
+        copy['set'](name, value)
+    return copy
+
+def init_base(instance, base, *args):
+    """
+    Run the '__init__' of a base class on an instance, unless it already ran during this construction.
+
+    This is how an '__init__' initializes its bases. In a diamond such as TA,
+    Student and Faculty both initialize Person, but while 'new' or 'new_many'
+    constructs the TA, Person's '__init__' runs only for the first of them.
+    The base code reads and writes its own copy of any renamed field: on a
+    record instance whose 'set' is its own and whose class has no hooks, the
+    renamed slots are swapped with the plain ones while the base '__init__'
+    runs, using the slot pairs resolved when the class was built; otherwise
+    the base code sees the instance through as_base.
+
+    Args:
+        instance (dict): The dispatch dictionary of the instance being initialized.
+        base (dict): The base class whose '__init__' to run.
+        *args: Arguments to pass to that '__init__'.
+    """
+    init = base['get']('__init__')
+    done = instance.get('initialized')
+    if done is not None:  # the common case: a diamond under construction
+        if init in done or not init:
+            return
+        done.add(init)
+    elif not init:
+        return
+    elif isinstance(instance, dict) and 'instance' in instance:  # a view from as_base
+        return init_base(instance['instance'], base, *args)
+    cls = instance.get('class')
+    swaps = cls['renamed_slots'].get(base['name']) if cls is not None and cls['renamed_slots'] else None
+    if not swaps:
+        init(instance, *args)
+    elif getattr(instance['set'], '__code__', None) in RECORD_SETTERS and not cls['hooks'][0]:
+        record = instance['storage']
+        for plain, renamed in swaps:
+            record[plain], record[renamed] = record[renamed], record[plain]
+        try:
+            init(instance, *args)
+        finally:
+            for plain, renamed in swaps:
+                record[plain], record[renamed] = record[renamed], record[plain]
+    else:
+        init(as_base(instance, base), *args)
+
+def run_init(instance, init, args):
+    """
+    Run the '__init__' of an instance of a diamond class, tracking the base initializers that ran.
+
+    The functions that already ran are kept in the instance under 'initialized'
+    (where init_base looks for them) while the '__init__' runs, and removed when it returns.
+    """
+    instance['initialized'] = {init}
+    try:
+        init(instance, *args)
+    finally:
+        del instance['initialized']
+
+def as_base(instance, base):
+    """
+    Return the instance as seen by the methods of one of its bases.
+
+    For most bases that is the instance itself. For a base whose fields are
+    renamed in the class of the instance (see make_class), it is a view whose
+    'get' and 'set' map those fields to their renamed slots, and which binds
+    the class methods to itself so that they see the same renames. The view
+    refers to the instance under 'instance'. It is built once per instance and
+    base and kept in the instance 'views' entry, except for acyclic and
+    compiled instances, which must not refer to themselves.
+
+    Args:
+        instance (dict): The dispatch dictionary of the instance.
+        base (dict): A class in the MRO of the instance class.
+
+    Returns:
+        dict: The instance or a view of it.
+    """
+    cls = instance.get('class')
+    if cls is None or not cls['renames']:
+        return instance
+    name = base['name']
+    renames = cls['renames'].get(name)
+    if not renames:
+        return instance
+    views = instance.get('views') if isinstance(instance, dict) else None
+    if views is not None and name in views:
+        return views[name]
+    layout = cls['layout']
+    bound = {}  # name -> method bound to the view, filled against the class 'get' under None
+
+    def get_value(name):
+        """Retrieve a field through its renamed slot, or a class method bound to the view."""
+        if name in renames:
+            return instance['get'](renames[name])
+        if name not in layout:
+            class_get = cls['get']
+            if bound.get(None) is not class_get:
+                bound.clear()
+                bound[None] = class_get
+            elif name in bound:
+                return bound[name]
+            method = class_get(name)
+            if callable(method):
+                method = bound[name] = bind_method(method, view)
+                return method
+        return instance['get'](name)
+
+    def set_value(name, value):
+        instance['set'](renames.get(name, name), value)
+
+    view = {'get': get_value, 'set': set_value, 'class': cls, 'instance': instance}
+    if views is not None:
+        views[name] = view
+    elif isinstance(instance, dict) and not cls['acyclic']:
+        instance['views'] = {name: view}
+    return view
+
+def renamed_field(cls, base, field):
+    """Return the layout slot that holds a field of base in instances of cls, such as 'Faculty.seniority' for TA."""
+    renames = cls['renames'].get(base['name'])
+    return renames.get(field, field) if renames else field
+
+def make_instance(cls):
+    """
+    Create a new object instance, represented as a dispatch dictionary.
+
+    Methods are bound once per name and cached on the instance. The cache is
+    dropped whenever the class publishes a new resolution table (any 'set' in its
+    MRO), and a name is evicted when the instance itself sets it.
+
+    Besides 'get' and 'set', the instance dict refers to its class under 'class'
+    and to its attribute dict under 'storage', for serialization.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class.
+
+    Returns:
+        dict: A dispatch dictionary representing the instance.
+    """
+    if cls['acyclic']:
+        return make_acyclic_instance(cls)
+    if cls['layout']:
+        return make_record_instance(cls, cls['layout'])
+    attributes = {}
+    bound = {}
+    bound_for = [None]  # the class 'get' the bound cache was filled against
+    hooks = cls['hooks']
+
+    def get_value(name):
+        """Retrieve an attribute or method, checking the class if necessary."""
+        if name in attributes:
+            return attributes[name]
+        class_get = cls['get']
+        if class_get is not bound_for[0]:
+            bound.clear()
+            bound_for[0] = class_get
+        elif name in bound:
+            return bound[name]
+        value = bound[name] = bind_method(class_get(name), instance)
+        return value
+
+    def set_value(name, value):
+        """Set an attribute or method in the instance."""
+        current = hooks[0]
+        if current:
+            old = attributes.get(name)
+            attributes[name] = value
+            for hook in current:
+                hook(instance, name, old, value)
+        else:
+            attributes[name] = value
+        if name in bound:
+            del bound[name]
+
+    instance = {'get': get_value, 'set': set_value, 'class': cls, 'storage': attributes}
+    if PROFILE is not None:
+        PROFILE['wrap_instance'](cls, instance)
+    return instance
+
+def make_record_instance(cls, layout):
+    """
+    Create a new object instance whose declared fields live in a fixed-index list.
+
+    Behaves exactly like make_instance, but a name found in the class layout is
+    stored at its index instead of in a per-instance dict. The same list carries
+    the instance bookkeeping in three trailing slots: [-3] a dict of undeclared
+    names and [-2] the bound-method cache, both created on first use, and [-1]
+    the class 'get' that cache was filled against. The record is the instance
+    'storage'.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class.
+        layout (dict): Maps each declared field name to its index in the record.
+
+    Returns:
+        dict: A dispatch dictionary representing the instance.
+    """
+    record = cls['blank'][:]
+    hooks = cls['hooks']
+
+    def get_value(name):
+        """Retrieve a field, an undeclared attribute or a method, checking the class if necessary."""
+        index = layout.get(name)
+        if index is not None:
+            value = record[index]
+            if value is not MISSING:
+                return value
+        elif record[-3] is not None and name in record[-3]:
+            return record[-3][name]
+        class_get = cls['get']
+        methods = record[-2]
+        if class_get is not record[-1] or methods is None:
+            methods = record[-2] = {}
+            record[-1] = class_get
+        elif name in methods:
+            return methods[name]
+        value = class_get(name)
+        accessor = getattr(value, 'accessor', None)
+        if accessor is None:
+            value = methods[name] = bind_method(value, instance)
+        else:
+            value = methods[name] = bind_accessor(accessor, instance, record, layout)
+        return value
+
+    def set_value(name, value):
+        """Set a field in its slot, or any other name in the overflow dict."""
+        index = layout.get(name)
+        current = hooks[0]
+        if current:
+            if index is not None:
+                old = None if record[index] is MISSING else record[index]
+            else:
+                old = None if record[-3] is None else record[-3].get(name)
+        if index is not None:
+            record[index] = value
+        else:
+            if record[-3] is None:
+                record[-3] = {}
+            record[-3][name] = value
+        if record[-2] is not None and name in record[-2]:
+            del record[-2][name]
+        if current:
+            for hook in current:
+                hook(instance, name, old, value)
+
+    instance = {'get': get_value, 'set': set_value, 'class': cls, 'storage': record}
+    if PROFILE is not None:
+        PROFILE['wrap_instance'](cls, instance)
+    return instance
+
+# A dict that can be weakly referenced, for acyclic instances.
+InstanceDict = type('InstanceDict', (dict,), {'__slots__': ('__weakref__',)})
+
+def make_acyclic_instance(cls):
+    """
+    Create an instance that holds no reference to itself.
+
+    A regular instance is a reference cycle: its dict holds 'get', whose closure
+    (and bound-method cache) refers back to the dict, so it is only freed by the
+    cyclic garbage collector. Here the closures keep the field record and a weak
+    reference to the instance instead, and methods and accessors are bound
+    anew on every lookup rather than cached, so dropping the last reference frees the
+    instance at once. The record has the layout of make_record_instance, with
+    its bound-method slots left unused.
+
+    A bound method keeps its instance alive, like a Python bound method. The
+    'get' and 'set' functions alone do not, so they fail once the instance is gone.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class.
+
+    Returns:
+        dict: A dispatch dictionary representing the instance.
+    """
+    layout = cls['layout']
+    record = cls['blank'][:]
+    hooks = cls['hooks']
+
+    def get_value(name):
+        """Retrieve a field, an undeclared attribute or a method, binding methods to the instance."""
+        index = layout.get(name)
+        if index is not None:
+            value = record[index]
+            if value is not MISSING:
+                return value
+        elif record[-3] is not None and name in record[-3]:
+            return record[-3][name]
+        value = cls['get'](name)
+        accessor = getattr(value, 'accessor', None)
+        if accessor is None:
+            return bind_method(value, ref())
+        return bind_accessor(accessor, ref(), record, layout)
+
+    def set_value(name, value):
+        """Set a field in its slot, or any other name in the overflow dict."""
+        index = layout.get(name)
+        current = hooks[0]
+        if current:
+            if index is not None:
+                old = None if record[index] is MISSING else record[index]
+            else:
+                old = None if record[-3] is None else record[-3].get(name)
+        if index is not None:
+            record[index] = value
+        else:
+            if record[-3] is None:
+                record[-3] = {}
+            record[-3][name] = value
+        if current:
+            instance = ref()
+            for hook in current:
+                hook(instance, name, old, value)
+
+    instance = InstanceDict(get=get_value, set=set_value, storage=record)
+    instance['class'] = cls
+    ref = weakref.ref(instance)
+    if PROFILE is not None:
+        PROFILE['wrap_instance'](cls, instance)
+    return instance
+
+def instance_anchor(instance):
+    """
+    Return the anchor of an instance: a function returning the instance that lives exactly as long as it does.
+
+    Instances cannot be weakly referenced themselves, but their anchor can:
+    a weak reference to the anchor dies with the instance. The anchor is kept
+    in the instance 'anchor' entry. It refers back to the instance, except in
+    acyclic instances, where it holds a weak reference so as not to add a
+    cycle.
+
+    Args:
+        instance (dict): The dispatch dictionary representing the instance.
+
+    Returns:
+        callable: The anchor.
+    """
+    anchor = instance.get('anchor')
+    if anchor is None:
+        if isinstance(instance, InstanceDict):
+            self_ref = weakref.ref(instance)
+            anchor = lambda: self_ref()
+        else:
+            anchor = lambda: instance
+        instance['anchor'] = anchor
+    return anchor
+
+# The code of the 'set' of record and acyclic instances, to tell it from the wrappers of frozen instances and render caches.
+# A tuple, not a set: hashing a code object costs more than comparing by identity.
+RECORD_SETTERS = tuple(const for factory in (make_record_instance, make_acyclic_instance)
+                       for const in factory.__code__.co_consts if getattr(const, 'co_name', None) == 'set_value')
+
+def bind_accessor(accessor, instance, record, layout):
+    """
+    Bind a generated field accessor directly to the record of an instance.
+
+    The getter reads the field slot itself; the setter validates and then goes
+    through the instance 'set', so hooks and wrappers still see the change.
+
+    Args:
+        accessor (tuple): The (kind, name, validator) attribute of a make_accessors function.
+        instance (dict): The dispatch dictionary representing the instance.
+        record (list): The field record of the instance.
+        layout (dict): Maps field names to their index in the record.
+
+    Returns:
+        callable: The bound accessor, carrying the same 'accessor' attribute.
+    """
+    kind, name, validator = accessor
+    index = layout[name]
+    if kind == 'get':
+        def bound():
+            value = record[index]
+            return instance['get'](name) if value is MISSING else value
+    else:
+        def bound(value):
+            if validator is None or validator(value):
+                instance['set'](name, value)
+    bound.accessor = accessor
+    return bound
+
+def bind_method(method_name, instance):
+    """
+    Bind a method to an instance if it is callable.
+
+    Args:
+        method_name (callable or any): A method or attribute retrieved from the class.
+        instance (dict): The dispatch dictionary representing the instance.
+
+    Returns:
+        callable or any: A bound method if `method_name` is callable, otherwise the original value.
+    """
+    if callable(method_name):
+        def method(*args):
+            return method_name(instance, *args)
+
+        return method
+    else:
+        return method_name
@@ -0,0 +1,121 @@
+"""Vectorized operations on dates packed as yyyymmdd ordinals."""
+from array import array
+
+from .columns import DATE_PARTS
+from .core import optional_numpy
+
+def date_ordinals(rows, field=None):
+    """
+    Collect the packed yyyymmdd ordinals of many dates into an integer array.
+
+    Args:
+        rows (iterable or dict): Dates, instances holding a date field, or a column store.
+        field (str, optional): The date field of the instances or of the column store. Without it, rows are dates.
+
+    Returns:
+        array: The ordinals, as array('q') in row order.
+    """
+    numpy = optional_numpy()
+    if isinstance(rows, dict) and 'column' in rows:
+        day, month, year = (rows['column'](f'{field}.{part}') for part in DATE_PARTS)
+        if numpy is not None:
+            parts = [numpy.frombuffer(column, dtype=column.typecode) for column in (day, month, year)]
+            return array('q', (parts[2] * 10000 + parts[1] * 100 + parts[0]).tobytes())
+        return array('q', [y * 10000 + m * 100 + d for d, m, y in zip(day, month, year)])
+    if field is not None:
+        rows = (row['get'](field) for row in rows)
+    return array('q', [date['get']('getOrdinal')() for date in rows])
+
+def ordinal_values(ordinals):
+    """View an ordinal array as a numpy array when numpy is available."""
+    numpy = optional_numpy()
+    if numpy is not None and isinstance(ordinals, array):
+        return numpy.frombuffer(ordinals, dtype=ordinals.typecode)
+    return ordinals
+
+def ages(ordinals, on):
+    """
+    Compute the age in whole years of every date at a reference date.
+
+    With yyyymmdd ordinals the age is (on - ordinal) // 10000: the month and day
+    digits only borrow a year when the birthday has not come yet.
+
+    Args:
+        ordinals (array): Birth date ordinals, from date_ordinals.
+        on (int or dict): The reference date, as an ordinal or a date.
+
+    Returns:
+        array or list: The ages, as a numpy array when numpy is available.
+    """
+    numpy = optional_numpy()
+    if isinstance(on, dict):
+        on = on['get']('getOrdinal')()
+    values = ordinal_values(ordinals)
+    if numpy is not None:
+        return (on - values) // 10000
+    return [(on - ordinal) // 10000 for ordinal in values]
+
+def dates_between(ordinals, low=None, high=None):
+    """
+    Return the positions of the ordinals within [low, high].
+
+    Args:
+        ordinals (array): Date ordinals, from date_ordinals.
+        low (int or dict, optional): The earliest date, as an ordinal or a date.
+        high (int or dict, optional): The latest date, as an ordinal or a date.
+
+    Returns:
+        list: Matching positions, in ascending order.
+    """
+    numpy = optional_numpy()
+    low, high = (bound['get']('getOrdinal')() if isinstance(bound, dict) else bound for bound in (low, high))
+    values = ordinal_values(ordinals)
+    if numpy is not None:
+        mask = numpy.ones(len(values), dtype=bool)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return numpy.flatnonzero(mask).tolist()
+    return [i for i, ordinal in enumerate(values)
+            if (low is None or ordinal >= low) and (high is None or ordinal <= high)]
+
+def bucket_dates(ordinals, by='year'):
+    """
+    Group positions by the year (yyyy) or month (yyyymm) of their date.
+
+    Args:
+        ordinals (array): Date ordinals, from date_ordinals.
+        by (str): 'year' or 'month'.
+
+    Returns:
+        dict: Maps each year or month to the list of positions in it, in ascending order of key.
+    """
+    numpy = optional_numpy()
+    divisor = {'year': 10000, 'month': 100}[by]
+    values = ordinal_values(ordinals)
+    keys = values // divisor if numpy is not None else [ordinal // divisor for ordinal in values]
+    buckets = {}
+    for i, key in enumerate(keys.tolist() if numpy is not None else keys):
+        buckets.setdefault(key, []).append(i)
+    return dict(sorted(buckets.items()))
+
+def sort_by_date(rows, field='date', reverse=False):
+    """
+    Sort instances by a date field, reading one ordinal per instance.
+
+    Args:
+        rows (list): Instances holding a date field.
+        field (str): The date field.
+        reverse (bool): Whether to sort from the latest date.
+
+    Returns:
+        list: The instances, sorted stably by date.
+    """
+    numpy = optional_numpy()
+    ordinals = date_ordinals(rows, field)
+    if numpy is not None:
+        order = numpy.argsort(ordinal_values(ordinals), kind='stable')
+        order = order[::-1] if reverse else order
+        return [rows[i] for i in order.tolist()]
+    return [rows[i] for i in sorted(range(len(rows)), key=ordinals.__getitem__, reverse=reverse)]
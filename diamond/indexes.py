@@ -0,0 +1,172 @@
+"""Secondary indexes on a field of a class."""
+import bisect
+import threading
+import weakref
+
+from .core import MISSING, instance_anchor, renamed_field
+from .queries import field_value
+
+def make_index(cls, field, ordered=False, instances=(), key=None):
+    """
+    Create an index of the instances of a class (and of its subclasses) by the value of one field.
+
+    The index watches the class, so every 'set' of the field, whether direct or
+    through a setter such as 'setId', moves the instance to its new value. In a
+    subclass that renames the field, such as TA for the seniority of Faculty,
+    the renamed slot is indexed (see renamed_field). Instances
+    that set the field before the index existed can be added with 'add'. An ordered
+    index also keeps its distinct values sorted for 'range' queries.
+
+    Indexed values must be hashable. To index a field holding an instance, such
+    as the date of a Person, give a path into it ('date.year') or a key function
+    (key=lambda date: date['get']('getOrdinal')()). The path or key is applied
+    when the field itself is set; changes made inside the nested instance are
+    not seen until the instance is added again. A path index is also used by
+    queries on that path; an index with a key function is not, as its values
+    are not those of the field.
+
+    The index holds its instances weakly (see instance_anchor): an instance that
+    is no longer used elsewhere leaves the index once it is collected.
+
+    Writers serialize on a lock of the index, and every bucket and the sorted
+    key list are replaced rather than mutated, so lookups never take the lock.
+
+    Args:
+        cls (dict): The dispatch dictionary of the indexed class.
+        field (str): The name of the indexed field, or a dotted path into a field holding an instance.
+        ordered (bool): Whether to support range queries.
+        instances (iterable, optional): Existing instances to index right away.
+        key (callable, optional): Turns the value of the field (or path) into the indexed value.
+
+    Returns:
+        dict: A dispatch dictionary representing the index.
+    """
+    top, rest = (field, '') if field in cls['layout'] or '.' not in field else field.split('.', 1)
+    entries = {}  # value -> {id(instance): weak reference to its anchor}, never mutated once published
+    values = {}  # id(instance) -> its indexed value
+    refs = {}  # id(instance) -> weak reference to the anchor of the instance
+    dead = []  # ids of collected instances, removed on the next write
+    keys = [[]]  # the sorted distinct values, for ordered indexes; replaced on every change
+    lock = threading.Lock()
+
+    def indexed_value(value):
+        """The value the index keeps for a value of the field itself."""
+        if rest and value is not None:
+            value = field_value(value, rest)
+        if key is not None and value is not None:
+            value = key(value)
+        return value
+
+    def unlink(ident):
+        refs.pop(ident, None)
+        value = values.pop(ident, MISSING)
+        if value is MISSING:
+            return
+        bucket = dict(entries[value])
+        del bucket[ident]
+        if bucket:
+            entries[value] = bucket
+        else:
+            del entries[value]
+            if ordered:
+                sorted_keys = list(keys[0])
+                del sorted_keys[bisect.bisect_left(sorted_keys, value)]
+                keys[0] = sorted_keys
+
+    def purge():
+        """Drop the instances collected since the last write; runs under the lock."""
+        while dead:
+            ident = dead.pop()
+            ref = refs.get(ident)
+            if ref is not None and ref() is None:  # not an instance that has since reused the id
+                unlink(ident)
+
+    def remove(instance):
+        """Remove an instance from the index."""
+        with lock:
+            purge()
+            if lookup(instance) is instance:
+                unlink(id(instance))
+
+    def insert(instance, value):
+        if value is not None:
+            try:
+                hash(value)
+            except TypeError:
+                raise TypeError(f"Index on '{field}' cannot hold a {type(value).__name__}; index a path into it, "
+                                f"such as '{field}.year', or give a key function") from None
+        with lock:
+            purge()
+            ident = id(instance)
+            ref = refs.get(ident) if lookup(instance) is instance else None
+            unlink(ident)
+            if value is None:
+                return
+            if ref is None:
+                ref = weakref.ref(instance_anchor(instance), lambda _: dead.append(ident))
+            refs[ident] = ref
+            values[ident] = value
+            if value not in entries and ordered:
+                sorted_keys = list(keys[0])
+                bisect.insort(sorted_keys, value)
+                keys[0] = sorted_keys
+            bucket = dict(entries.get(value, {}))
+            bucket[ident] = ref
+            entries[value] = bucket
+
+    def lookup(instance):
+        """Return the live instance the index holds under the id of instance, if any."""
+        anchor = refs.get(id(instance), lambda: None)()
+        return None if anchor is None else anchor()
+
+    def on_set(instance, name, old, new):
+        if (name == top or '.' in name) and name == renamed_field(instance['class'], cls, top):
+            insert(instance, indexed_value(new))
+
+    def add(more):
+        """Index instances whose field was set before the index existed."""
+        for instance in more:
+            insert(instance, indexed_value(instance['get'](renamed_field(instance['class'], cls, top))))
+
+    def covers(instance):
+        """Return whether an instance is indexed, or has no value for the field and so is rightly left out."""
+        if lookup(instance) is instance and id(instance) in values:
+            return True
+        return indexed_value(instance['get'](renamed_field(instance['class'], cls, top))) is None
+
+    def live(bucket):
+        return [anchor() for anchor in [ref() for ref in bucket.values()] if anchor is not None]
+
+    def find(value):
+        """Return the instances whose indexed value equals value."""
+        return live(entries.get(value, {}))
+
+    def value_range(low=None, high=None):
+        """Yield the instances whose indexed value lies in [low, high], in ascending order of that value."""
+        if not ordered:
+            raise TypeError(f"Index on '{field}' is not ordered")
+        sorted_keys = keys[0]
+        start = 0 if low is None else bisect.bisect_left(sorted_keys, low)
+        stop = len(sorted_keys) if high is None else bisect.bisect_right(sorted_keys, high)
+        for value in sorted_keys[start:stop]:
+            yield from live(entries.get(value, {}))
+
+    def size():
+        """Return the number of live instances in the index."""
+        with lock:
+            purge()
+            return len(values)
+
+    def drop():
+        """Stop maintaining the index."""
+        cls['unwatch'](on_set)
+        if cls['indexes'].get(field) is index:
+            del cls['indexes'][field]
+
+    index = {'find': find, 'range': value_range, 'add': add, 'remove': remove, 'drop': drop, 'covers': covers,
+             'field': field, 'key': key, 'ordered': ordered, 'size': size}
+    cls['watch'](on_set)
+    if key is None:
+        cls['indexes'][field] = index
+    add(instances)
+    return index
@@ -0,0 +1,116 @@
+"""Asynchronous roster ingestion from byte streams."""
+from .roster import roster_parser
+
+async def ingest_roster(stream, cls, format='csv', converters=None, batch_size=1024, max_pending=4, linger=0.05,
+                        executor=None):
+    """
+    Build instances from a roster arriving on an async byte stream, such as a socket or a pipe.
+
+    Three stages run concurrently: a reader collects lines from the stream
+    into batches of up to 'batch_size', a builder parses each batch and
+    constructs it with 'new_many', and the caller takes the instances from
+    this async iterator. The stages are joined by queues of at most
+    'max_pending' batches, so a slow consumer stops the builder, which stops
+    the reader, which stops reading the stream and lets the sender's flow
+    control push back. A partial batch is built once no line has arrived
+    for 'linger' seconds, so a trickle of records is not held back.
+
+    Building a batch is the only CPU-heavy step. Inline it holds the event
+    loop for one batch at a time; with an executor (a ThreadPoolExecutor, as
+    instances cannot be pickled) it runs off the loop. The stream is read
+    until EOF; closing the iterator early cancels the reader and the builder.
+
+    Args:
+        stream: An asyncio.StreamReader, or any async iterable of byte lines.
+        cls (dict): The dispatch dictionary of the class to build.
+        format (str): 'csv' or 'jsonl', as in read_roster.
+        converters (dict, optional): As in read_roster.
+        batch_size (int): Most lines built together.
+        max_pending (int): Most batches waiting between two stages.
+        linger (float): Seconds to wait for more lines before building a partial batch.
+        executor (Executor, optional): Runs the parsing and building of each batch.
+
+    Yields:
+        dict: One instance per roster record, in stream order.
+    """
+    import asyncio  # only the pipeline needs it, and it is slow to import
+    parse = roster_parser(cls, format, converters)
+    loop = asyncio.get_running_loop()
+    lines_queue = asyncio.Queue(max_pending)
+    built_queue = asyncio.Queue(max_pending)
+    done = object()
+
+    def build(lines):
+        rows = parse([line.decode() for line in lines if line.strip()])
+        return cls['new_many'](rows) if rows else []
+
+    async def chunks():
+        """Yield the complete lines of the stream as they arrive, reading a StreamReader in large blocks."""
+        if not hasattr(stream, 'read'):
+            async for line in stream:
+                yield [line]
+            return
+        rest = b''
+        while data := await stream.read(1 << 16):
+            lines = (rest + data).split(b'\n')
+            rest = lines.pop()
+            if lines:
+                yield lines
+        if rest:
+            yield [rest]
+
+    async def read():
+        source = chunks()
+        batch = []
+        pending = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(source.__anext__())
+                if batch:
+                    await asyncio.wait((pending,), timeout=linger)
+                    if not pending.done():  # the stream went quiet: build what has arrived
+                        await lines_queue.put(batch)
+                        batch = []
+                        continue
+                try:
+                    batch += await pending
+                except StopAsyncIteration:
+                    break
+                pending = None
+                while len(batch) >= batch_size:
+                    await lines_queue.put(batch[:batch_size])
+                    del batch[:batch_size]
+        finally:
+            if pending is not None:
+                pending.cancel()
+        if batch:
+            await lines_queue.put(batch)
+        await lines_queue.put(done)
+
+    async def build_batches():
+        while (lines := await lines_queue.get()) is not done:
+            instances = build(lines) if executor is None else await loop.run_in_executor(executor, build, lines)
+            await built_queue.put(instances)
+        await built_queue.put(done)
+
+    async def supervise(stage):
+        try:
+            await stage
+        except asyncio.CancelledError:  # the consumer closed the iterator and no longer drains the queue
+            raise
+        except Exception as error:  # hand the failure to the consumer instead of losing it in a task
+            await built_queue.put(error)
+            raise
+
+    tasks = [asyncio.ensure_future(supervise(read())), asyncio.ensure_future(supervise(build_batches()))]
+    try:
+        while (instances := await built_queue.get()) is not done:
+            if isinstance(instances, BaseException):
+                raise instances
+            for instance in instances:
+                yield instance
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,96 @@
+"""Instances whose fields are read from a row source on first access."""
+from . import core
+from .core import freeze_instance, make_instance, reject_set
+
+def make_lazy_instance(cls, source, key):
+    """
+    Create an instance whose declared fields are decoded from a row source on first access.
+
+    A row source is a dispatch dictionary with a 'field' entry, field(key, name),
+    returning the stored value of one field or None, and optionally a 'write'
+    entry, write(key, name, value). Column stores and snapshots are row sources.
+    Each field is read from the source at most once and then cached; fields the
+    source does not have fall back to the class, like unassigned fields. Values
+    set on the instance are kept in the cache and recorded as dirty until
+    'flush' writes them back.
+
+    Besides 'get' and 'set', the instance has 'class', 'dirty' (the changed
+    names and values), 'flush' (write the changes back through the source
+    'write' and return them) and 'materialize' (build a regular instance with
+    every field decoded). Nested views into the source, such as the date view
+    of a column store row, are materialized as well, so the regular instance
+    shares no state with the source.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class.
+        source (dict): The row source.
+        key (any): The key of the row in the source, such as a row index or position.
+
+    Returns:
+        dict: A dispatch dictionary representing the instance.
+    """
+    layout = cls['layout']
+    read = source['field']
+    values = {}  # decoded fields and assigned names
+    dirty = set()
+    bound = {}
+    bound_for = [None]  # the class 'get' the bound cache was filled against
+    hooks = cls['hooks']
+
+    def get_value(name):
+        """Retrieve a cached value, decode a field, or retrieve a method, checking the class if necessary."""
+        if name in values:
+            return values[name]
+        if name in layout:
+            value = read(key, name)
+            if value is not None:
+                values[name] = value
+                return value
+        class_get = cls['get']
+        if class_get is not bound_for[0]:
+            bound.clear()
+            bound_for[0] = class_get
+        elif name in bound:
+            return bound[name]
+        value = bound[name] = core.bind_method(class_get(name), instance)
+        return value
+
+    def set_value(name, value):
+        """Set an attribute in the cache and mark it dirty."""
+        current = hooks[0]
+        if current:
+            old = values[name] if name in values else read(key, name) if name in layout else None
+        values[name] = value
+        dirty.add(name)
+        if name in bound:
+            del bound[name]
+        if current:
+            for hook in current:
+                hook(instance, name, old, value)
+
+    def flush():
+        """Write the dirty values back to the source and return them."""
+        changes = {name: values[name] for name in dirty}
+        if 'write' not in source:
+            raise TypeError('The row source of this instance is read-only')
+        for name, value in changes.items():
+            source['write'](key, name, value)
+        dirty.clear()
+        return changes
+
+    def materialize():
+        """Return a regular instance of the class holding every field of this one."""
+        full = make_instance(cls)
+        for name in layout:
+            value = get_value(name)
+            if isinstance(value, dict) and 'materialize' in value:  # a view into the source, not a value of its own
+                value = value['materialize']()
+            if value is not None and not callable(value):
+                full['set'](name, value)
+        for name in dirty.difference(layout):
+            full['set'](name, values[name])
+        return freeze_instance(cls, full) if cls['frozen'] else full
+
+    instance = {'get': get_value, 'set': reject_set if cls['frozen'] else set_value, 'class': cls,
+                'dirty': lambda: {name: values[name] for name in dirty}, 'flush': flush, 'materialize': materialize}
+    return instance
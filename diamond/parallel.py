@@ -0,0 +1,95 @@
+"""Parallel map, filter and reduce over populations of instances in worker processes."""
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+import os
+
+from .serialization import dump_instance, load_instance
+
+def run_chunk(task, function, start, dumped):
+    """
+    Worker side of the parallel helpers: rebuild a chunk of instances and apply one step to it.
+
+    Args:
+        task (str): 'map', 'filter' or 'reduce'.
+        function (callable or tuple): The mapper or predicate, or (reducer, initial, mapper) for 'reduce'.
+        start (int): Position of the chunk in the population.
+        dumped (list): The dumped instances of the chunk.
+
+    Returns:
+        list or any: Mapped values, matching positions, or the reduced value of the chunk.
+    """
+    instances = [load_instance(data) for data in dumped]
+    if task == 'map':
+        return [function(instance) for instance in instances]
+    if task == 'filter':
+        return [start + i for i, instance in enumerate(instances) if function(instance)]
+    reducer, initial, mapper = function
+    return reduce(reducer, map(mapper, instances), initial)
+
+def run_parallel(task, function, population, workers=None, chunk_size=None):
+    """Split a population into chunks, run one step per chunk in a process pool and return the chunk results in order."""
+    population = list(population)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-len(population) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_chunk, task, function, start,
+                               [dump_instance(instance) for instance in population[start:start + chunk_size]])
+                   for start in range(0, len(population), chunk_size)]
+        return population, [future.result() for future in futures]
+
+def parallel_map(function, population, workers=None, chunk_size=None):
+    """
+    Apply a function to every instance of a population in worker processes.
+
+    Args:
+        function (callable): A module-level (picklable) function of one instance.
+        population (iterable): Instances of named classes.
+        workers (int, optional): Number of processes; defaults to the CPU count.
+        chunk_size (int, optional): Instances sent per task; defaults to four tasks per worker.
+
+    Returns:
+        list: The results, in population order.
+    """
+    _, chunks = run_parallel('map', function, population, workers, chunk_size)
+    return [result for chunk in chunks for result in chunk]
+
+def parallel_filter(predicate, population, workers=None, chunk_size=None):
+    """
+    Keep the instances of a population for which a predicate, evaluated in worker processes, is true.
+
+    Args:
+        predicate (callable): A module-level (picklable) function of one instance.
+        population (iterable): Instances of named classes.
+        workers (int, optional): Number of processes; defaults to the CPU count.
+        chunk_size (int, optional): Instances sent per task.
+
+    Returns:
+        list: The original (not rebuilt) instances that matched, in population order.
+    """
+    population, chunks = run_parallel('filter', predicate, population, workers, chunk_size)
+    return [population[i] for chunk in chunks for i in chunk]
+
+def parallel_reduce(reducer, population, initial, mapper=None, workers=None, chunk_size=None):
+    """
+    Map and reduce a population in worker processes, then combine the per-chunk results.
+
+    Each chunk is reduced from 'initial' and the chunk results are reduced again
+    from 'initial', so 'reducer' must be associative with 'initial' as identity,
+    for example operator.add with 0.
+
+    Args:
+        reducer (callable): A module-level (picklable) function of two values.
+        population (iterable): Instances of named classes.
+        initial (any): The identity value of the reducer.
+        mapper (callable, optional): A module-level function turning an instance into a value. Defaults to the identity.
+        workers (int, optional): Number of processes; defaults to the CPU count.
+        chunk_size (int, optional): Instances sent per task.
+
+    Returns:
+        any: The reduced value.
+    """
+    _, chunks = run_parallel('reduce', (reducer, initial, mapper or identity), population, workers, chunk_size)
+    return reduce(reducer, chunks, initial)
+
+def identity(value):
+    return value
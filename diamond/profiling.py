@@ -0,0 +1,178 @@
+"""Profiling of how lookups on classes and instances are resolved."""
+import time
+
+from . import core
+
+def enable_profiling():
+    """
+    Start recording how lookups on classes and instances are resolved.
+
+    While profiling is enabled, every class publishes a counting 'get', instances
+    created from then on count their own lookups, and bind_method and
+    bind_accessor count the closures they create. Nothing is wrapped while
+    profiling is disabled, so it costs nothing then; only instances created
+    during profiling keep their counting 'get' afterwards.
+
+    Returns:
+        dict: The raw statistics, also available through profile_snapshot.
+    """
+    if core.PROFILE is not None:
+        return core.PROFILE
+    core.PROFILE = {'lookups': {}, 'latency': {}, 'binds': 0, 'class_hit': False,
+                    'bind_method': core.bind_method, 'bind_accessor': core.bind_accessor,
+                    'wrap_lookup': profile_class_lookup, 'wrap_instance': profile_instance}
+    core.bind_method = profile_bind(core.bind_method)
+    core.bind_accessor = profile_bind(core.bind_accessor)
+    refresh_all_classes()
+    return core.PROFILE
+
+def disable_profiling():
+    """Stop recording lookups and return the statistics gathered so far."""
+    profile = core.PROFILE
+    if profile is not None:
+        core.bind_method = profile['bind_method']
+        core.bind_accessor = profile['bind_accessor']
+        core.PROFILE = None
+        refresh_all_classes()
+    return profile
+
+def refresh_all_classes():
+    """Republish the 'get' of every class, each once; classes are created after their bases."""
+    with core.CLASS_LOCK:
+        for cls in core.CLASSES:
+            cls['rebuild']()
+
+def lookup_stats(profile, class_name, name):
+    key = (class_name, name)
+    if key not in profile['lookups']:
+        profile['lookups'][key] = {'instance': 0, 'class': 0, 'miss': 0, 'owners': {}, 'depth': {}}
+    return profile['lookups'][key]
+
+def record_latency(profile, class_name, level, elapsed):
+    """Count a lookup in the power-of-two nanosecond bucket of its latency."""
+    buckets = profile['latency'].setdefault((class_name, level), {})
+    bucket = 1 << elapsed.bit_length()
+    buckets[bucket] = buckets.get(bucket, 0) + 1
+
+def profile_class_lookup(cls, lookup):
+    """
+    Wrap the resolution table lookup of a class so that it records hits, misses and which class in the MRO answered.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class.
+        lookup (callable): The 'get' of its resolution table.
+
+    Returns:
+        callable: The counting 'get'.
+    """
+    profile = core.PROFILE
+    class_name = cls['name']
+    owners = {}  # name -> (MRO depth, owner name) of the class that defines it
+
+    def owner_of(name):
+        for depth, klass in enumerate(cls['mro']()):
+            if name in klass['attributes']():
+                return depth, klass['name']
+        return None, None
+
+    def get_value(name):
+        start = time.perf_counter_ns()
+        value = lookup(name)
+        elapsed = time.perf_counter_ns() - start
+        profile['class_hit'] = True
+        stats = lookup_stats(profile, class_name, name)
+        if name not in owners:
+            owners[name] = owner_of(name)
+        depth, owner = owners[name]
+        if owner is None:
+            stats['miss'] += 1
+            record_latency(profile, class_name, 'miss', elapsed)
+        else:
+            stats['class'] += 1
+            stats['owners'][owner] = stats['owners'].get(owner, 0) + 1
+            stats['depth'][depth] = stats['depth'].get(depth, 0) + 1
+            record_latency(profile, class_name, 'class', elapsed)
+        return value
+
+    return get_value
+
+def profile_instance(cls, instance):
+    """
+    Wrap the 'get' of an instance so that lookups answered by the instance itself are counted.
+
+    A lookup counts as an instance hit when the class 'get' was not consulted,
+    which covers the instance's own fields and its bound-method cache.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class of the instance.
+        instance (dict): The dispatch dictionary representing the instance.
+    """
+    profile = core.PROFILE
+    class_name = cls['name']
+    get_value = instance['get']
+
+    def profiled_get(name):
+        profile['class_hit'] = False
+        start = time.perf_counter_ns()
+        value = get_value(name)
+        elapsed = time.perf_counter_ns() - start
+        if not profile['class_hit']:
+            lookup_stats(profile, class_name, name)['instance'] += 1
+            record_latency(profile, class_name, 'instance', elapsed)
+        return value
+
+    instance['get'] = profiled_get
+
+def profile_bind(bind):
+    """Wrap bind_method or bind_accessor so that every closure it creates is counted."""
+    profile = core.PROFILE
+
+    def counting_bind(target, *args):
+        bound = bind(target, *args)
+        if bound is not target:
+            profile['binds'] += 1
+        return bound
+
+    return counting_bind
+
+def profile_snapshot(profile=None):
+    """
+    Summarize profiling statistics.
+
+    Args:
+        profile (dict, optional): Raw statistics from enable_profiling or disable_profiling.
+            Defaults to the current profiling session.
+
+    Returns:
+        dict: Per 'Class.name' counts by level, miss rate, answering classes and MRO depths,
+            per 'Class.level' latency histograms keyed by their upper bound in nanoseconds,
+            and the number of closures bind_method and bind_accessor created.
+    """
+    profile = core.PROFILE if profile is None else profile
+    if profile is None:
+        return {'lookups': {}, 'latency': {}, 'binds': 0}
+    lookups = {}
+    for (class_name, name), stats in profile['lookups'].items():
+        total = stats['instance'] + stats['class'] + stats['miss']
+        lookups[f'{class_name}.{name}'] = {'total': total, 'instance': stats['instance'], 'class': stats['class'],
+                                           'miss': stats['miss'], 'miss_rate': stats['miss'] / total if total else 0.0,
+                                           'owners': dict(stats['owners']), 'depth': dict(stats['depth'])}
+    latency = {f'{class_name}.{level}': dict(sorted(buckets.items()))
+               for (class_name, level), buckets in profile['latency'].items()}
+    return {'lookups': lookups, 'latency': latency, 'binds': profile['binds']}
+
+def profile_report(profile=None, top=10):
+    """
+    Print the hottest looked-up names with where they were resolved.
+
+    Args:
+        profile (dict, optional): Raw statistics; defaults to the current profiling session.
+        top (int): How many names to show.
+    """
+    snapshot = profile_snapshot(profile)
+    hot = sorted(snapshot['lookups'].items(), key=lambda item: item[1]['total'], reverse=True)[:top]
+    print(f"{'name':40} {'total':>10} {'instance':>10} {'class':>10} {'miss':>8}  answered by")
+    for name, stats in hot:
+        owners = ', '.join(f'{owner}:{count}' for owner, count in stats['owners'].items())
+        print(f"{name:40} {stats['total']:>10} {stats['instance']:>10} {stats['class']:>10} {stats['miss']:>8}  {owners}")
+    print(f"closures created by binding: {snapshot['binds']}")
@@ -0,0 +1,229 @@
+"""Queries over instances, column stores and snapshots."""
+from functools import reduce
+import heapq
+from itertools import islice
+import operator
+
+from .core import CLASSES, optional_numpy, renamed_field
+
+QUERY_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+                   '>': operator.gt, '>=': operator.ge, 'in': lambda value, values: value in values}
+
+def make_query(source, cls=None, plan=None):
+    """
+    Create a query over a population of instances or over a column store.
+
+    A query is built by chaining 'where', 'order_by', 'group_by', 'limit' and
+    'select', each of which returns a new query, and is run by iterating 'rows'.
+    Field names may be paths into nested instances, such as 'date.year'.
+
+        query = make_query(students, Student)['where']('faculty', '==', 'swe')['where']('grades', '>', 90)
+        names = query['where']('date.year', '>', 2000)['select']('lastName')['rows']()
+
+    Conditions are pushed down where possible. On a column store, every
+    condition on a column is evaluated by the store 'filter_columns' (vectorized when
+    numpy is available) and only matching rows get a view. On a population of
+    instances, the most selective usable index of the class or of one of its
+    bases (an equality on any index, or a range on an ordered one) produces the
+    candidates, and the remaining conditions are checked on those only. An
+    index only covers the instances created or set after it existed (see
+    make_index), so it is used for a given population only if it covers every
+    instance of cls in it; otherwise, or with no index, every instance is
+    checked. 'count' counts what 'rows' yields, so it honours 'limit' and
+    counts groups under 'group_by'.
+
+    Args:
+        source (list or dict): Instances, or a column store. None queries the instances in the indexes of cls.
+        cls (dict, optional): Only keep instances of this class and its subclasses, and use their indexes.
+        plan (dict, optional): The clauses so far; used by the chaining methods.
+
+    Returns:
+        dict: A dispatch dictionary representing the query.
+    """
+    plan = plan or {'where': (), 'order_by': None, 'group_by': None, 'limit': None, 'select': None}
+    columnar = isinstance(source, dict) and 'filter' in source
+
+    def extend(**clauses):
+        return make_query(source, cls, dict(plan, **clauses))
+
+    def where(field, op, value):
+        """Keep the rows whose field compares to value with op, one of QUERY_OPERATORS."""
+        if op not in QUERY_OPERATORS:
+            raise ValueError(f'Unknown query operator: {op}')
+        return extend(where=plan['where'] + ((field, op, value),))
+
+    def find_index(field, op):
+        """Return an index of cls or one of its bases that can answer a condition, or None."""
+        if cls is None or columnar or op not in ('==', 'in', '<', '<=', '>', '>='):
+            return None
+        for klass in cls['mro']():
+            index = klass['indexes'].get(field)
+            if index is not None and (op in ('==', 'in') or index['ordered']):
+                return index
+        return None
+
+    member = {}  # id(class) -> whether it is cls or a subclass of it
+
+    def is_member(row):
+        klass = row['class']
+        if id(klass) not in member:
+            member[id(klass)] = any(base is cls for base in klass['mro']())
+        return member[id(klass)]
+
+    def choose_index():
+        """Pick the condition answered by an index that covers the source, preferring equality over ranges."""
+        ranked = sorted((op not in ('==', 'in'), i) for i, (field, op, value) in enumerate(plan['where'])
+                        if find_index(field, op) is not None)
+        for _, i in ranked:
+            field, op, value = plan['where'][i]
+            covers = find_index(field, op)['covers']
+            if source is None or all(covers(row) for row in source if is_member(row)):
+                return plan['where'][i]
+        return None
+
+    def candidates():
+        """Yield the rows that may match, using the pushed-down condition, and the conditions left to check."""
+        conditions = plan['where']
+        if columnar:
+            pushed = {}
+            rest = []
+            for field, op, value in conditions:
+                try:
+                    source['column'](field)
+                except KeyError:
+                    rest.append((field, op, value))
+                    continue
+                pushed.setdefault(field, []).append(column_predicate(op, value))
+            matches = source['filter_columns']({field: combine_predicates(predicates) for field, predicates in pushed.items()})
+            return map(source['row'], matches), rest
+        pushed = choose_index()
+        if pushed is None:
+            if source is None:
+                raise ValueError('A query without a source needs a condition answered by an index')
+            return source, conditions
+        field, op, value = pushed
+        index = find_index(field, op)
+        if op == '==':
+            rows = index['find'](value)
+        elif op == 'in':
+            rows = [row for item in dict.fromkeys(value) for row in index['find'](item)]  # each value once
+        else:
+            low = value if op in ('>', '>=') else None
+            high = value if op in ('<', '<=') else None
+            rows = index['range'](low, high)
+        if source is not None:
+            population = {id(row) for row in source}
+            rows = (row for row in rows if id(row) in population)
+        rest = tuple(condition for condition in conditions if condition is not pushed or op in ('<', '>'))
+        return rows, rest
+
+    def matching():
+        """Yield the rows that satisfy every condition and belong to cls."""
+        rows, rest = candidates()
+        checks = [(field_reader(field, cls), QUERY_OPERATORS[op], value) for field, op, value in rest]
+        for row in rows:
+            if cls is not None and not columnar and not is_member(row):
+                continue
+            for read, compare, value in checks:
+                if not compare(read(row), value):
+                    break
+            else:
+                yield row
+
+    def rows():
+        """Run the query, yielding instances (or row views), tuples of the selected fields, or (key, rows) groups."""
+        results = matching()
+        if plan['order_by'] is not None:
+            field, reverse = plan['order_by']
+            key = field_reader(field, cls)
+            if plan['limit'] is not None and plan['group_by'] is None:
+                pick = heapq.nlargest if reverse else heapq.nsmallest
+                results = iter(pick(plan['limit'], results, key=key))
+            else:
+                results = iter(sorted(results, key=key, reverse=reverse))
+        project = plan['select']
+        if project is not None:
+            readers = [field_reader(field, cls) for field in project]
+            shape = lambda row: tuple(read(row) for read in readers)
+        else:
+            shape = lambda row: row
+        if plan['group_by'] is not None:
+            groups = {}
+            group_key = field_reader(plan['group_by'], cls)
+            for row in results:
+                groups.setdefault(group_key(row), []).append(shape(row))
+            results = iter(groups.items())
+        else:
+            results = map(shape, results)
+        if plan['limit'] is not None:
+            results = islice(results, plan['limit'])
+        yield from results
+
+    def explain():
+        """Describe how the query will find its rows."""
+        if columnar:
+            return 'column store filter'
+        pushed = choose_index()
+        if pushed is None:
+            return 'scan'
+        return f"index on '{pushed[0]}' for {pushed[0]} {pushed[1]} {pushed[2]!r}"
+
+    return {'where': where, 'order_by': lambda field, reverse=False: extend(order_by=(field, reverse)),
+            'group_by': lambda field: extend(group_by=field), 'limit': lambda n: extend(limit=n),
+            'select': lambda *fields: extend(select=fields), 'rows': rows,
+            'count': lambda: sum(1 for _ in rows()), 'explain': explain}
+
+def field_reader(path, cls=None):
+    """
+    Return a function reading a field of an instance or row view.
+
+    Dots lead into nested instances, unless the whole path is a field of cls
+    (or, without cls, of the class of the row), such as 'Faculty.seniority'.
+    A field of cls that a subclass renames is read from the renamed slot in
+    instances of that subclass.
+    """
+    if cls is not None and path in cls['layout'] and any(path in klass['renames'].get(cls['name'], ()) for klass in CLASSES):
+        slots = {}  # id(class of the row) -> the slot holding the field
+
+        def read_renamed(row):
+            klass = row['class']
+            slot = slots.get(id(klass))
+            if slot is None:
+                slot = slots[id(klass)] = renamed_field(klass, cls, path)
+            return row['get'](slot)
+
+        return read_renamed
+    if '.' not in path or (cls is not None and path in cls['layout']):
+        return lambda row: row['get'](path)
+    if cls is None:
+        return lambda row: field_value(row, path)
+    name, rest = path.split('.', 1)
+    read_rest = field_reader(rest)
+
+    def read(row):
+        value = row['get'](name)
+        return None if value is None else read_rest(value)
+
+    return read
+
+def field_value(row, path):
+    """Return a field of an instance or row view, following dots into nested instances unless the whole path is a field."""
+    if '.' not in path or path in row['class']['layout']:
+        return row['get'](path)
+    name, rest = path.split('.', 1)
+    value = row['get'](name)
+    return None if value is None else field_value(value, rest)
+
+def column_predicate(op, value):
+    """Turn a query condition into a column store predicate, which may receive a whole numpy column."""
+    numpy = optional_numpy()
+    if op == 'in':
+        values = set(value)
+        return lambda column: numpy.isin(column, list(values)) if numpy is not None and isinstance(column, numpy.ndarray) else column in values
+    compare = QUERY_OPERATORS[op]
+    return lambda column: compare(column, value)
+
+def combine_predicates(predicates):
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda column: reduce(operator.and_, (predicate(column) for predicate in predicates))
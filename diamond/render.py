@@ -0,0 +1,87 @@
+"""Caching of the rendered strings of instances."""
+import weakref
+
+def cache_rendering(instance, names=('str', 'repr')):
+    """
+    Opt an instance into caching the output of its rendering methods.
+
+    The instance 'get' and 'set' entries are wrapped. While a rendering method
+    runs, every name it reads through 'get' is recorded as a dependency, and any
+    instance found in one of those fields (such as a nested Date) is watched. A
+    later 'set' of a recorded field, or any 'set' on such a nested instance,
+    drops the cached output; other sets leave it in place.
+
+    A nested instance has its 'set' wrapped only once, however many cached
+    instances share it. The wrapper notifies the weakly held caches registered
+    under its 'render_listeners' entry, so it keeps none of them alive.
+
+    Args:
+        instance (dict): The dispatch dictionary of the instance.
+        names (tuple): The rendering methods to cache.
+
+    Returns:
+        dict: The same instance, now caching its rendering.
+    """
+    get_value = instance['get']
+    set_value = instance['set']
+    rendered = {}
+    renderers = {}
+    depends = set()
+    rendering = [0]
+    watched = set()
+
+    def invalidate():
+        rendered.clear()
+        depends.clear()
+
+    def watch(nested):
+        """Drop the cache whenever a nested instance read during rendering is mutated."""
+        watched.add(id(nested))
+        listeners = nested.get('render_listeners')
+        if listeners is None:
+            listeners = nested['render_listeners'] = weakref.WeakSet()
+            nested_set = nested['set']
+
+            def notify(name, value):
+                nested_set(name, value)
+                for listener in list(listeners):
+                    listener()
+
+            nested['set'] = notify
+        listeners.add(invalidate)
+
+    def renderer(name):
+        def render():
+            if name not in rendered:
+                rendering[0] += 1
+                try:
+                    rendered[name] = get_value(name)()
+                finally:
+                    rendering[0] -= 1
+            return rendered[name]
+
+        return render
+
+    def tracked_get(name):
+        """Retrieve a name, recording it as a dependency while rendering."""
+        if name in names:
+            if name not in renderers:
+                renderers[name] = renderer(name)
+            return renderers[name]
+        value = get_value(name)
+        if rendering[0]:
+            # Generated getters read the field slot without calling 'get', so record the field itself.
+            depends.add(value.accessor[1] if hasattr(value, 'accessor') else name)
+            if isinstance(value, dict) and 'set' in value and id(value) not in watched:
+                watch(value)
+        return value
+
+    def tracked_set(name, value):
+        """Set a name, dropping the cached output if rendering depends on it."""
+        set_value(name, value)
+        if name in depends:
+            invalidate()
+
+    instance['get'] = tracked_get
+    instance['set'] = tracked_set
+    return instance
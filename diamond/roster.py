@@ -0,0 +1,162 @@
+"""Streaming roster I/O: instances from and to CSV or JSON Lines files."""
+from itertools import islice
+
+from .core import get_class
+
+def parse_number(text):
+    """Convert a numeric column to int when it has no fractional part, otherwise to float."""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def parse_date(value):
+    """
+    Build a Date from a 'dd.mm.yyyy' string (as written by the date 'str') or a [day, month, year] list.
+
+    Args:
+        value (str or list): The serialized date.
+
+    Returns:
+        dict: An instance of the class registered as 'MyDate'.
+    """
+    if isinstance(value, str):
+        value = value.split('.')
+    day, month, year = value
+    return get_class('MyDate')['new'](int(day), int(month), int(year))
+
+def format_date(date):
+    """Render a Date as 'dd.mm.yyyy' straight from its fields."""
+    return f"{date['get']('day')}.{date['get']('month')}.{date['get']('year')}"
+
+ROSTER_CONVERTERS = {'date': parse_date, 'id': int, 'grades': parse_number, 'salary': parse_number,
+                     'seniority': int, 's_seniority': int, 'f_seniority': int}
+
+def init_params(cls):
+    """
+    Return the names of the constructor arguments of a class, in order.
+
+    Args:
+        cls (dict): The dispatch dictionary representing the class.
+
+    Returns:
+        list: The '__init__' parameter names, without 'self'.
+    """
+    code = cls['get']('__init__').__code__
+    return list(code.co_varnames[1:code.co_argcount])
+
+def read_roster(file, cls, format='csv', converters=None, batch_size=1024):
+    """
+    Lazily build instances of a class from a CSV or JSON Lines roster.
+
+    CSV files must start with a header row; columns are matched to the '__init__'
+    arguments of the class by name, in any order. JSON Lines records are objects
+    keyed by the same names. Rows are built 'batch_size' at a time with
+    'new_many', so memory stays flat however large the file is.
+
+    Args:
+        file (file): An open text file, or any iterable of lines.
+        cls (dict): The dispatch dictionary of the class to build.
+        format (str): 'csv' or 'jsonl'.
+        converters (dict, optional): Maps argument names to functions applied to the raw value.
+            Defaults to ROSTER_CONVERTERS.
+
+    Yields:
+        dict: One instance per roster row.
+    """
+    parse = roster_parser(cls, format, converters)
+    lines = iter(file)
+    while True:
+        chunk = list(islice(lines, batch_size))
+        if not chunk:
+            return
+        rows = parse(chunk)
+        if rows:
+            yield from cls['new_many'](rows)
+
+def roster_parser(cls, format='csv', converters=None):
+    """
+    Return a function that turns consecutive chunks of roster lines into constructor arguments.
+
+    The function is called with successive lists of lines of one roster. For
+    CSV the header is taken from the first line it sees. Records must not span
+    lines, so quoted CSV fields cannot contain newlines.
+
+    Args:
+        cls (dict): The dispatch dictionary of the class to build.
+        format (str): 'csv' or 'jsonl'.
+        converters (dict, optional): Maps argument names to functions applied to the raw value.
+            Defaults to ROSTER_CONVERTERS.
+
+    Returns:
+        callable: parse(lines), returning one list of '__init__' arguments per record in the lines.
+    """
+    import csv
+    import json
+    converters = ROSTER_CONVERTERS if converters is None else converters
+    params = init_params(cls)
+    convert = [converters.get(param) for param in params]
+    positions = []
+
+    def records(lines):
+        if format == 'jsonl':
+            return ([record[param] for param in params] for record in map(json.loads, lines) if record)
+        rows = csv.reader(lines)
+        if not positions:
+            header = next(rows, None)
+            if header is None:
+                return ()
+            positions.extend(header.index(param) for param in params)
+        return ([row[i] for i in positions] for row in rows if row)
+
+    def parse(lines):
+        return [[value if function is None else function(value) for function, value in zip(convert, values)]
+                for values in records(lines)]
+
+    if format not in ('csv', 'jsonl'):
+        raise ValueError(f'Unknown roster format: {format}')
+    return parse
+
+def write_roster(file, cls, instances, format='csv'):
+    """
+    Write instances of a class as a CSV or JSON Lines roster that read_roster can load back.
+
+    Columns follow the '__init__' arguments of the class, which is also the
+    'getAttributes' order. Each value is read from the field of the same name, or
+    through the getter named for it in the class '__columns__'. Rows are handed to
+    the writer in one 'writerows'/'writelines' call per batch.
+
+    Args:
+        file (file): An open text file.
+        cls (dict): The dispatch dictionary of the class the instances belong to.
+        instances (iterable): The instances to write.
+        format (str): 'csv' or 'jsonl'.
+    """
+    import csv
+    import json
+    params = init_params(cls)
+    getters = cls['get']('__columns__') or {}
+
+    def values(instance):
+        row = []
+        for param in params:
+            value = instance['get'](getters[param])() if param in getters else instance['get'](param)
+            if isinstance(value, dict):
+                value = format_date(value)
+            row.append(value)
+        return row
+
+    if format == 'csv':
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(params)
+        writer.writerows(map(values, instances))
+    elif format == 'jsonl':
+        batch = []
+        for instance in instances:
+            batch.append(json.dumps(dict(zip(params, values(instance)))) + '\n')
+            if len(batch) == 1024:
+                file.writelines(batch)
+                batch = []
+        file.writelines(batch)
+    else:
+        raise ValueError(f'Unknown roster format: {format}')
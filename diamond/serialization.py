@@ -0,0 +1,78 @@
+"""Serialization of instances to and from plain, picklable data."""
+from .core import MISSING, freeze_instance, get_class, make_instance
+
+INSTANCE_TAG = '__instance__'
+
+def dump_instance(instance):
+    """
+    Turn an instance into plain, picklable data.
+
+    Declared fields are dumped in layout order and undeclared ones as a dict;
+    nested instances such as birth dates are dumped recursively. Callables kept
+    on the instance (like the cached 'str' of a frozen instance) are skipped,
+    since load_instance recreates them.
+
+    Args:
+        instance (dict): The dispatch dictionary of an instance of a named class.
+
+    Returns:
+        tuple: (INSTANCE_TAG, class name, field values, undeclared attributes or None).
+    """
+    if 'storage' not in instance:  # a lazy instance
+        instance = instance['materialize']()
+    cls = instance['class']
+    storage = instance['storage']
+    if cls['layout']:
+        fields = tuple(dump_value(value) for value in storage[:-3])
+        extra = storage[-3]
+    else:
+        fields = ()
+        extra = storage
+    if extra:
+        extra = {name: dump_value(value) for name, value in extra.items() if not callable(value)}
+    return (INSTANCE_TAG, cls['name'], fields, extra or None)
+
+def dump_value(value):
+    if isinstance(value, dict) and 'class' in value:
+        return dump_instance(value)
+    return None if value is MISSING else value
+
+def load_instance(data):
+    """
+    Rebuild an instance from the output of dump_instance.
+
+    The class is looked up by name, so this works in any process that defined
+    the same classes. Fields are restored without running '__init__', straight
+    into the record unless the class has hooks, in which case they go through the
+    instance 'set'; frozen instances are frozen (and interned) again afterwards.
+
+    Args:
+        data (tuple): The dumped instance.
+
+    Returns:
+        dict: The rebuilt instance.
+    """
+    _, name, fields, extra = data
+    cls = get_class(name)
+    instance = make_instance(cls)
+    if cls['hooks'][0]:
+        for field, value in zip(cls['layout'], fields):
+            if value is not None:
+                instance['set'](field, load_value(value))
+    else:
+        record = instance['storage']
+        for i, value in enumerate(fields):
+            if value is not None:
+                record[i] = load_value(value)
+    for attribute, value in (extra or {}).items():
+        instance['set'](attribute, load_value(value))
+    if cls['frozen']:
+        instance = freeze_instance(cls, instance)
+        if cls['intern'] is not None:
+            instance = cls['intern'](instance)
+    return instance
+
+def load_value(value):
+    if isinstance(value, tuple) and value and value[0] == INSTANCE_TAG:
+        return load_instance(value)
+    return value
@@ -0,0 +1,196 @@
+"""Binary snapshots of instances that load lazily from a memory map."""
+from array import array
+
+from .columns import DATE_PARTS
+from .core import MISSING, get_class
+from .lazy import make_lazy_instance
+from .serialization import INSTANCE_TAG, load_instance, load_value
+
+SNAPSHOT_MAGIC = b'DIMSNAP1'
+SNAPSHOT_HEADER = '<8sQ'  # struct formats: magic, length of the JSON header that follows
+SNAPSHOT_INT = '<Bq'
+SNAPSHOT_FLOAT = '<Bd'
+SNAPSHOT_CELL = 9  # bytes per field: a tag and an 8-byte payload
+NONE_CELL, INT_CELL, FLOAT_CELL, STRING_CELL, DATE_CELL = range(5)
+
+def write_snapshot(path, instances):
+    """
+    Write a population of instances to a binary snapshot file.
+
+    Instances are grouped by class. Each class section holds one fixed-width
+    record per instance, with one 9-byte cell per declared field in layout order:
+    integers and floats are stored as 8-byte numbers, strings as indices into a
+    shared string table, and dates (any instance whose fields are day, month, year, plus derived ones)
+    as packed parts plus the index of their class name. An order table keeps the
+    position of every instance, so records can be found by offset without reading
+    the rest of the file. Undeclared attributes are not written.
+
+    Args:
+        path (str): The file to write.
+        instances (iterable): Instances of named classes with declared fields.
+
+    Returns:
+        int: The number of instances written.
+    """
+    import json
+    import struct
+    header_cell, int_cell, float_cell = (struct.Struct(layout) for layout in (SNAPSHOT_HEADER, SNAPSHOT_INT, SNAPSHOT_FLOAT))
+    strings = {}
+    sections = {}  # class name -> (section index, fields, list of packed records)
+    order = array('Q')
+
+    def string_index(text):
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    def pack_cell(buffer, offset, value):
+        if value is None or value is MISSING:
+            int_cell.pack_into(buffer, offset, NONE_CELL, 0)
+        elif isinstance(value, bool) or not isinstance(value, (int, float, str, dict)):
+            raise TypeError(f'Cannot write {type(value).__name__} values to a snapshot')
+        elif isinstance(value, int):
+            int_cell.pack_into(buffer, offset, INT_CELL, value)
+        elif isinstance(value, float):
+            float_cell.pack_into(buffer, offset, FLOAT_CELL, value)
+        elif isinstance(value, str):
+            int_cell.pack_into(buffer, offset, STRING_CELL, string_index(value))
+        elif value['class']['key_fields'] == DATE_PARTS:
+            day, month, year = (value['get'](part) for part in DATE_PARTS)
+            packed = string_index(value['class']['name']) << 32 | year << 16 | month << 8 | day
+            int_cell.pack_into(buffer, offset, DATE_CELL, packed)
+        else:
+            raise TypeError(f"Cannot write nested '{value['class']['name']}' instances to a snapshot")
+
+    count = 0
+    for instance in instances:
+        cls = instance['class']
+        if cls['name'] not in sections:
+            sections[cls['name']] = (len(sections), list(cls['layout']), [])
+        section, fields, records = sections[cls['name']]
+        record = bytearray(SNAPSHOT_CELL * len(fields))
+        storage = instance['storage']
+        for i in range(len(fields)):
+            pack_cell(record, i * SNAPSHOT_CELL, storage[i])
+        order.append(section << 32 | len(records))
+        records.append(record)
+        count += 1
+
+    encoded = [text.encode('utf-8') for text in strings]
+    string_offsets = array('Q', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    header = {'size': count, 'classes': []}
+    offset = 0
+    for name, (_, fields, records) in sections.items():
+        header['classes'].append({'name': name, 'fields': fields, 'count': len(records), 'offset': offset})
+        offset += SNAPSHOT_CELL * len(fields) * len(records)
+    header['order'] = offset
+    header['strings'] = offset + order.itemsize * len(order)
+    header['string_count'] = len(encoded)
+    # Offsets in the header are relative to the end of the header itself.
+    encoded_header = json.dumps(header).encode('utf-8')
+    with open(path, 'wb') as file:
+        file.write(header_cell.pack(SNAPSHOT_MAGIC, len(encoded_header)))
+        file.write(encoded_header)
+        for _, _, records in sections.values():
+            file.write(b''.join(records))
+        file.write(order.tobytes())
+        file.write(string_offsets.tobytes())
+        file.write(b''.join(encoded))
+    return count
+
+def load_snapshot(path):
+    """
+    Open a snapshot file written by write_snapshot, without reading its records.
+
+    The file is memory-mapped and only the header is parsed, so opening costs the
+    same for any population size. Instances are materialized on first access
+    through 'row' and then kept, so the same position always returns the same
+    instance; 'field' decodes a single field without materializing anything.
+    The class of each section is looked up by name with get_class.
+
+    Args:
+        path (str): The snapshot file.
+
+    Returns:
+        dict: A dispatch dictionary with 'size', 'row', 'rows', 'class_of',
+        'field', 'fields', 'lazy' and 'close'. It is a read-only row source
+        for make_lazy_instance, and 'lazy' returns such an instance for a position.
+    """
+    import json
+    import mmap
+    import struct
+    header_cell, int_cell, float_cell = (struct.Struct(layout) for layout in (SNAPSHOT_HEADER, SNAPSHOT_INT, SNAPSHOT_FLOAT))
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, header_size = header_cell.unpack_from(buffer, 0)
+    if magic != SNAPSHOT_MAGIC:
+        buffer.close()
+        raise ValueError(f'{path} is not a snapshot file')
+    base = header_cell.size + header_size
+    header = json.loads(buffer[header_cell.size:base])
+    sections = header['classes']
+    for section in sections:
+        section['layout'] = {field: i for i, field in enumerate(section['fields'])}
+        section['width'] = SNAPSHOT_CELL * len(section['fields'])
+    order_start = base + header['order']
+    string_offsets_start = base + header['strings']
+    string_data_start = string_offsets_start + 8 * (header['string_count'] + 1)
+    strings = {}  # index -> decoded string, filled on demand
+    materialized = {}
+
+    def string(index):
+        if index not in strings:
+            start, end = struct.unpack_from('<QQ', buffer, string_offsets_start + 8 * index)
+            strings[index] = buffer[string_data_start + start:string_data_start + end].decode('utf-8')
+        return strings[index]
+
+    def locate(position):
+        if not 0 <= position < header['size']:
+            raise IndexError(f'Snapshot position {position} out of range')
+        entry, = struct.unpack_from('<Q', buffer, order_start + 8 * position)
+        section = sections[entry >> 32]
+        return section, base + section['offset'] + section['width'] * (entry & 0xFFFFFFFF)
+
+    def decode_cell(offset):
+        tag, payload = int_cell.unpack_from(buffer, offset)
+        if tag == INT_CELL:
+            return payload
+        if tag == FLOAT_CELL:
+            return float_cell.unpack_from(buffer, offset)[1]
+        if tag == STRING_CELL:
+            return string(payload)
+        if tag == DATE_CELL:
+            return (INSTANCE_TAG, string(payload >> 32), (payload & 0xFF, payload >> 8 & 0xFF, payload >> 16 & 0xFFFF), None)
+        return None
+
+    def field(position, name):
+        """Decode one field of the instance at a position, or return None if it is not stored."""
+        section, offset = locate(position)
+        index = section['layout'].get(name)
+        if index is None:
+            return None
+        return load_value(decode_cell(offset + SNAPSHOT_CELL * index))
+
+    def row(position):
+        """Materialize (once) and return the instance at a position."""
+        if position not in materialized:
+            section, offset = locate(position)
+            values = tuple(decode_cell(offset + SNAPSHOT_CELL * i) for i in range(len(section['fields'])))
+            materialized[position] = load_instance((INSTANCE_TAG, section['name'], values, None))
+        return materialized[position]
+
+    def close():
+        materialized.clear()
+        buffer.close()
+
+    def class_of(position):
+        return get_class(locate(position)[0]['name'])
+
+    snapshot = {'size': lambda: header['size'], 'row': row,
+                'rows': lambda: (row(position) for position in range(header['size'])),
+                'class_of': class_of, 'fields': lambda position: list(locate(position)[0]['fields']),
+                'field': field, 'lazy': lambda position: make_lazy_instance(class_of(position), snapshot, position),
+                'close': close}
+    return snapshot